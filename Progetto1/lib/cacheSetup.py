@@ -0,0 +1,208 @@
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+
+from Progetto1.lib import risolvi as ri
+from Progetto1.lib.colorazione import GaussSeidelColori
+from Progetto1.lib.controlli import controlloGradientePossibile, impronta
+from Progetto1.lib.precondizionatori import PrecondizionatoreSSOR, creaPrecondizionatore
+from Progetto1.lib.riordina import Riordinamento
+
+# Numero massimo di matrici di cui si conservano i dati di preparazione.
+MAX_MATRICI = 8
+# Memoria massima (in byte) occupata dalla cache; le matrici usate meno di recente vengono scartate.
+MAX_MEMORIA = 1024 ** 3
+
+# dati di preparazione per impronta della matrice, dal meno al più recentemente usato
+_cache = OrderedDict()
+
+
+class SetupMatrice:
+    """
+        Dati di preparazione dei metodi iterativi relativi a una matrice: copia CSR,
+        inversa della diagonale, risolutori triangolari, esito dei controlli per il
+        gradiente, precondizionatori e riordinamenti. Ogni dato viene calcolato alla prima richiesta
+        e poi riutilizzato finché la matrice resta in cache.
+
+        INPUT:
+        A: matrice sparsa quadrata.
+        chiave: impronta di A (vedi controlli.impronta).
+    """
+
+    def __init__(self, A, chiave):
+        self.chiave = chiave
+        # la copia protegge la cache da modifiche successive di A; se gli array CSR
+        # sono in sola lettura (es. in memoria condivisa) la copia non serve, e gli
+        # operatori con un metodo prodotto (es. matrici mappate su disco) restano tali
+        if sp.issparse(A) and A.format == 'csr' and not any(
+                a.flags.writeable for a in (A.data, A.indices, A.indptr)):
+            self.A = A
+        elif not sp.issparse(A) and hasattr(A, 'prodotto'):
+            self.A = A
+        else:
+            self.A = sp.csr_matrix(A, copy=True)
+        self.artefatti = {}
+        self.memoria = _dimensione(self.A)
+
+    def ottieni(self, nome, costruisci):
+        """
+            Restituisce il dato di preparazione nome, calcolandolo con costruisci()
+            se non è ancora presente.
+        """
+        if nome not in self.artefatti:
+            self.artefatti[nome] = costruisci()
+            self.memoria += _dimensione(self.artefatti[nome])
+            _liberaMemoria()
+        return self.artefatti[nome]
+
+    def inversaDiagonale(self):
+        """
+            Matrice diagonale inversa di A (vedi risolvi.InverseMatrixDiagonal).
+        """
+        return self.ottieni('D_inv', lambda: ri.InverseMatrixDiagonal(self.A))
+
+    def triangolareInferiore(self, metodo='auto'):
+        """
+            Risolutore della parte triangolare inferiore di A (vedi risolvi.TriangolareInferiore).
+        """
+        return self.ottieni(('L', metodo), lambda: ri.TriangolareInferiore(sp.tril(self._sparsa()), metodo))
+
+    def gaussSeidelColori(self, thread=1):
+        """
+            Passo di Gauss-Seidel multicolore di A (vedi colorazione.GaussSeidelColori).
+        """
+        return self.ottieni(('GSC', thread), lambda: GaussSeidelColori(self._sparsa(), thread))
+
+    def controlloGradientePossibile(self):
+        """
+            Verifica che A sia simmetrica e definita positiva (vedi controlli.controlloGradientePossibile).
+            Restituisce False se la definita positività non si è potuta decidere: in tal
+            caso l'esito non viene memorizzato.
+        """
+        if 'gradiente' not in self.artefatti:
+            try:
+                if not controlloGradientePossibile(self.A, self.chiave):
+                    return False
+                esito = None
+            except ValueError as e:
+                esito = str(e)
+            self.ottieni('gradiente', lambda: esito)
+        if self.artefatti['gradiente'] is not None:
+            raise ValueError(self.artefatti['gradiente'])
+        return True
+
+    def precondizionatore(self, tipo):
+        """
+            Precondizionatore di A (vedi precondizionatori.creaPrecondizionatore);
+            gli oggetti già costruiti passati come tipo vengono restituiti senza salvarli.
+        """
+        if hasattr(tipo, 'solve'):
+            return tipo
+        # il precondizionatore di Jacobi usa solo la diagonale, quindi accetta anche le matrici mappate
+        matrice = self.A if tipo == 'jacobi' else self._sparsa()
+        return self.ottieni(('M', tipo), lambda: creaPrecondizionatore(matrice, tipo))
+
+    def rilassamento(self):
+        """
+            Risolutori triangolari di SOR e SSOR (vedi precondizionatori.PrecondizionatoreSSOR).
+            È un'istanza separata dal precondizionatore 'ssor' perché i metodi ne cambiano
+            omega a ogni esecuzione.
+        """
+        return self.ottieni('SOR', lambda: PrecondizionatoreSSOR(self._sparsa()))
+
+    def raggioSpettraleJacobi(self):
+        """
+            Stima del raggio spettrale della matrice di iterazione di Jacobi
+            (vedi risolvi.raggioSpettraleJacobi).
+        """
+        return self.ottieni('rhoJacobi', lambda: ri.raggioSpettraleJacobi(self.A))
+
+    def riordinamento(self, metodo='rcm'):
+        """
+            Riordinamento simmetrico di A che ne riduce la banda (vedi riordina.Riordinamento).
+        """
+        return self.ottieni(('P', metodo), lambda: Riordinamento(self._sparsa(), metodo))
+
+    def _sparsa(self):
+        """
+            A come matrice sparsa in memoria; gli operatori che avvolgono una matrice
+            CSR (es. matriceParallela.MatriceParallela) la restituiscono con tocsr().
+
+            Solvable:
+            ValueError: se A è un operatore senza matrice in memoria (es. una matrice mappata).
+        """
+        if sp.issparse(self.A):
+            return self.A
+        if hasattr(self.A, 'tocsr'):
+            return self.A.tocsr()
+        raise ValueError("L'operazione richiede una matrice sparsa in memoria")
+
+
+def ottieniSetup(A):
+    """
+        Restituisce i dati di preparazione della matrice A, creandoli se la matrice
+        non è già in cache. La matrice è riconosciuta dalla sua impronta (forma, nnz,
+        hash degli array CSR), quindi anche copie diverse della stessa matrice
+        condividono la preparazione.
+
+        INPUT:
+        A: matrice sparsa quadrata.
+
+        OUTPUT:
+        setup: oggetto SetupMatrice associato ad A.
+    """
+    chiave = impronta(A)
+    if chiave in _cache:
+        _cache.move_to_end(chiave)
+        return _cache[chiave]
+
+    setup = SetupMatrice(A, chiave)
+    _cache[chiave] = setup
+    _liberaMemoria()
+    return setup
+
+
+def svuotaCache():
+    """
+        Elimina tutti i dati di preparazione memorizzati.
+    """
+    _cache.clear()
+
+
+def _liberaMemoria():
+    """
+        Scarta le matrici usate meno di recente finché la cache rispetta i limiti
+        sul numero di matrici e sulla memoria (la più recente viene sempre mantenuta).
+    """
+    while len(_cache) > 1 and (len(_cache) > MAX_MATRICI
+                               or sum(s.memoria for s in _cache.values()) > MAX_MEMORIA):
+        _cache.popitem(last=False)
+
+
+def _dimensione(oggetto, visti=None):
+    """
+        Stima la memoria in byte occupata dagli array NumPy e dalle matrici sparse
+        contenuti in oggetto (anche dentro liste, tuple, dizionari e attributi).
+    """
+    if visti is None:
+        visti = set()
+    if id(oggetto) in visti:
+        return 0
+    visti.add(id(oggetto))
+
+    if isinstance(oggetto, np.memmap):
+        # gli array mappati restano su disco
+        return 0
+    if isinstance(oggetto, np.ndarray):
+        return oggetto.nbytes
+    if sp.issparse(oggetto):
+        return sum(_dimensione(getattr(oggetto, a), visti) for a in ('data', 'indices', 'indptr', 'row', 'col')
+                   if hasattr(oggetto, a))
+    if isinstance(oggetto, dict):
+        return sum(_dimensione(v, visti) for v in oggetto.values())
+    if isinstance(oggetto, (list, tuple)):
+        return sum(_dimensione(v, visti) for v in oggetto)
+    if hasattr(oggetto, '__dict__'):
+        return _dimensione(vars(oggetto), visti)
+    return 0
@@ -0,0 +1,223 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import scipy.io as sio
+import scipy.sparse as sp
+
+# Dimensione (in byte) dei blocchi di testo letti e convertiti alla volta.
+DIM_BLOCCO = 1 << 24
+# Versione del formato della cache binaria; cambiandola le cache esistenti vengono ricreate.
+VERSIONE_CACHE = 1
+# Suffisso della cartella con la cache binaria, creata accanto al file .mtx.
+SUFFISSO_CACHE = '.cache'
+
+_VALORI_PER_CAMPO = {'real': 3, 'integer': 3, 'pattern': 2}
+_SIMMETRIE = ('general', 'symmetric', 'skew-symmetric')
+
+
+def caricaMatrice(percorso, cache=True, mmap=True):
+    """
+        Carica una matrice sparsa da un file Matrix Market (.mtx) in formato CSR.
+
+        Il file viene letto a blocchi di DIM_BLOCCO byte convertiti in un colpo solo
+        con NumPy, in due passate: la prima conta gli elementi di ogni riga, la seconda
+        li scrive direttamente negli array CSR, senza passare da una copia COO.
+        Sono gestiti i formati coordinate real, integer e pattern con simmetria general,
+        symmetric e skew-symmetric; gli altri (array, complex, hermitian) vengono letti
+        con scipy.io.mmread.
+
+        Con cache=True gli array CSR vengono salvati in una cartella accanto al file
+        (percorso + SUFFISSO_CACHE) e riutilizzati nei caricamenti successivi finché
+        data di modifica e dimensione del file non cambiano.
+
+        INPUT:
+        percorso: percorso del file .mtx.
+        cache: se vero usa e aggiorna la cache binaria.
+        mmap: se vero gli array letti dalla cache sono mappati in memoria in sola
+              lettura invece di essere copiati in RAM.
+
+        OUTPUT:
+        A: matrice sparsa CSR con valori float64.
+
+        Solvable:
+        ValueError: se il file non è un Matrix Market valido.
+    """
+    percorso = os.fspath(percorso)
+    stato = os.stat(percorso)
+    cartella = percorso + SUFFISSO_CACHE
+    if cache:
+        A = _leggiCache(cartella, stato, mmap)
+        if A is not None:
+            return A
+
+    with open(percorso, 'rb') as f:
+        formato, campo, simmetria, shape, nnz, inizio = _leggiIntestazione(f)
+    if formato != 'coordinate' or campo not in _VALORI_PER_CAMPO or simmetria not in _SIMMETRIE:
+        A = sp.csr_matrix(sio.mmread(percorso), dtype=np.float64)
+    else:
+        A = _costruisciCSR(percorso, inizio, campo, simmetria, shape, nnz)
+
+    if cache:
+        _scriviCache(cartella, stato, A)
+    return A
+
+
+def svuotaCacheMatrice(percorso):
+    """
+        Elimina la cache binaria associata al file .mtx, se presente.
+    """
+    shutil.rmtree(os.fspath(percorso) + SUFFISSO_CACHE, ignore_errors=True)
+
+
+def _leggiIntestazione(f):
+    """
+        Legge l'intestazione Matrix Market (banner, commenti e riga delle dimensioni).
+
+        OUTPUT:
+        formato, campo, simmetria, (righe, colonne), nnz, posizione del primo dato nel file.
+    """
+    banner = f.readline().decode('ascii', 'replace').split()
+    # alcuni file (come vem2.mtx) iniziano con un solo '%'
+    if len(banner) != 5 or banner[0].lstrip('%').lower() != 'matrixmarket' or banner[1].lower() != 'matrix':
+        raise ValueError("Il file non è in formato Matrix Market")
+    formato, campo, simmetria = (s.lower() for s in banner[2:])
+
+    riga = f.readline()
+    while riga.startswith(b'%') or not riga.strip():
+        if not riga:
+            raise ValueError("Il file Matrix Market non contiene le dimensioni della matrice")
+        riga = f.readline()
+    dimensioni = [int(v) for v in riga.split()]
+    if formato == 'coordinate':
+        if len(dimensioni) != 3:
+            raise ValueError("Riga delle dimensioni non valida nel file Matrix Market")
+        return formato, campo, simmetria, tuple(dimensioni[:2]), dimensioni[2], f.tell()
+    return formato, campo, simmetria, tuple(dimensioni[:2]), None, f.tell()
+
+
+def _blocchi(percorso, inizio, valori, nnz):
+    """
+        Restituisce, blocco per blocco, righe, colonne (base 0) e valori degli elementi
+        memorizzati nel file, a partire dalla posizione inizio.
+    """
+    letti = 0
+    with open(percorso, 'rb') as f:
+        f.seek(inizio)
+        resto = b''
+        while True:
+            testo = f.read(DIM_BLOCCO)
+            fine = not testo
+            testo = resto + testo
+            if not fine:
+                # il blocco viene troncato all'ultimo a capo, il resto passa al successivo
+                taglio = testo.rfind(b'\n') + 1
+                testo, resto = testo[:taglio], testo[taglio:]
+            if testo.strip():
+                numeri = np.fromstring(testo, dtype=np.float64, sep=' ')
+                if numeri.shape[0] % valori:
+                    raise ValueError("Numero di valori non valido nel file Matrix Market")
+                numeri = numeri.reshape(-1, valori)
+                letti += numeri.shape[0]
+                if letti > nnz:
+                    raise ValueError("Il file Matrix Market contiene più elementi di quelli dichiarati")
+                righe = numeri[:, 0].astype(np.int64) - 1
+                colonne = numeri[:, 1].astype(np.int64) - 1
+                dati = numeri[:, 2] if valori == 3 else np.ones(numeri.shape[0])
+                yield righe, colonne, dati
+            if fine:
+                break
+    if letti != nnz:
+        raise ValueError("Il file Matrix Market contiene meno elementi di quelli dichiarati")
+
+
+def _costruisciCSR(percorso, inizio, campo, simmetria, shape, nnz):
+    """
+        Costruisce la matrice CSR leggendo il file due volte: conteggio degli elementi
+        per riga e poi scrittura diretta di indici e valori nelle posizioni finali.
+    """
+    valori = _VALORI_PER_CAMPO[campo]
+    n = shape[0]
+
+    # prima passata: numero di elementi di ogni riga (anche quelli speculari)
+    conteggi = np.zeros(n, dtype=np.int64)
+    for righe, colonne, _ in _blocchi(percorso, inizio, valori, nnz):
+        if righe.size and (righe.min() < 0 or righe.max() >= n or colonne.min() < 0
+                           or colonne.max() >= shape[1]):
+            raise ValueError("Indici fuori dalle dimensioni dichiarate nel file Matrix Market")
+        conteggi += np.bincount(righe, minlength=n)
+        if simmetria != 'general':
+            conteggi += np.bincount(colonne[righe != colonne], minlength=n)
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(conteggi, out=indptr[1:])
+    tipoIndici = np.int32 if max(indptr[-1], shape[1]) < np.iinfo(np.int32).max else np.int64
+    indptr = indptr.astype(tipoIndici)
+    indices = np.empty(indptr[-1], dtype=tipoIndici)
+    data = np.empty(indptr[-1], dtype=np.float64)
+
+    # seconda passata: ogni elemento va in indptr[riga] + elementi della riga già scritti
+    cursore = indptr[:-1].astype(np.int64)
+    for righe, colonne, dati in _blocchi(percorso, inizio, valori, nnz):
+        if simmetria != 'general':
+            fuori = righe != colonne
+            segno = -1.0 if simmetria == 'skew-symmetric' else 1.0
+            righe, colonne = np.concatenate((righe, colonne[fuori])), np.concatenate((colonne, righe[fuori]))
+            dati = np.concatenate((dati, segno * dati[fuori]))
+        ordine = np.argsort(righe, kind='stable')
+        righe = righe[ordine]
+        # posizione di ogni elemento all'interno del gruppo della sua riga nel blocco
+        primi = np.flatnonzero(np.r_[True, righe[1:] != righe[:-1]])
+        rango = np.arange(righe.shape[0]) - np.repeat(primi, np.diff(np.r_[primi, righe.shape[0]]))
+        posizioni = cursore[righe] + rango
+        indices[posizioni] = colonne[ordine]
+        data[posizioni] = dati[ordine]
+        cursore += np.bincount(righe, minlength=n)
+
+    A = sp.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+    A.sum_duplicates()
+    return A
+
+
+def _leggiCache(cartella, stato, mmap):
+    """
+        Restituisce la matrice salvata nella cache binaria se è aggiornata rispetto
+        al file sorgente, altrimenti None.
+    """
+    try:
+        with open(os.path.join(cartella, 'meta.json')) as f:
+            meta = json.load(f)
+        if (meta['versione'] != VERSIONE_CACHE or meta['mtime_ns'] != stato.st_mtime_ns
+                or meta['dimensione'] != stato.st_size):
+            return None
+        modo = 'r' if mmap else None
+        array = [np.load(os.path.join(cartella, nome + '.npy'), mmap_mode=modo)
+                 for nome in ('data', 'indices', 'indptr')]
+    except (OSError, ValueError, KeyError):
+        return None
+    return sp.csr_matrix(tuple(array), shape=tuple(meta['shape']), copy=False)
+
+
+def _scriviCache(cartella, stato, A):
+    """
+        Salva gli array CSR di A nella cache binaria. La cartella viene preparata a
+        parte e poi sostituita a quella esistente, così un caricamento concorrente non
+        legge mai una cache scritta a metà. Gli errori di scrittura vengono ignorati.
+    """
+    meta = {'versione': VERSIONE_CACHE, 'mtime_ns': stato.st_mtime_ns,
+            'dimensione': stato.st_size, 'shape': list(A.shape), 'nnz': int(A.nnz)}
+    try:
+        temporanea = tempfile.mkdtemp(prefix='.tmp', dir=os.path.dirname(os.path.abspath(cartella)))
+        try:
+            for nome in ('data', 'indices', 'indptr'):
+                np.save(os.path.join(temporanea, nome + '.npy'), getattr(A, nome))
+            with open(os.path.join(temporanea, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            shutil.rmtree(cartella, ignore_errors=True)
+            os.replace(temporanea, cartella)
+        finally:
+            shutil.rmtree(temporanea, ignore_errors=True)
+    except OSError:
+        pass
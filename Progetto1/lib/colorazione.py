@@ -0,0 +1,115 @@
+import numpy as np
+import scipy.sparse as sp
+
+from Progetto1.lib import risolvi as ri
+from Progetto1.lib.matriceParallela import MatriceParallela
+from Progetto1.lib.risolvi import numba
+
+
+def colorazioneGreedy(A):
+    """
+        Colorazione greedy del grafo di adiacenza di A (struttura di A + A^T, senza
+        diagonale): ogni riga, nell'ordine naturale, riceve il colore più piccolo non
+        usato dalle righe adiacenti già colorate. Righe dello stesso colore non sono
+        accoppiate tra loro e possono essere aggiornate contemporaneamente.
+
+        INPUT:
+        A: matrice sparsa quadrata.
+
+        OUTPUT:
+        colori: vettore di interi con il colore (da 0) di ogni riga.
+    """
+    G = sp.csr_matrix(A)
+    G = (abs(G) + abs(G.T)).tocsr()
+    if numba is not None:
+        return _colorazioneNumba(G.shape[0], G.indptr, G.indices)
+
+    n = G.shape[0]
+    colori = np.full(n, -1, dtype=np.int64)
+    for i in range(n):
+        vicini = colori[G.indices[G.indptr[i]:G.indptr[i + 1]]]
+        usati = np.zeros(vicini.max(initial=-1) + 2, dtype=bool)
+        usati[vicini[vicini >= 0]] = True
+        colori[i] = np.argmin(usati)
+    return colori
+
+
+class GaussSeidelColori:
+    """
+        Passo di Gauss-Seidel multicolore in forma di correzione: risolve (D + L_c) dx = r,
+        dove L_c è la parte inferiore di A quando le incognite sono ordinate per colore
+        (vedi colorazioneGreedy). Dato che le righe di uno stesso colore non sono
+        accoppiate, ogni colore si aggiorna con un unico prodotto matrice-vettore sulle
+        colonne dei colori precedenti:
+            dx_c = D_c^-1 (r_c - A_{c,<c} dx)
+        quindi un passo costa quanto un prodotto matrice-vettore, come per Jacobi.
+        Ha la stessa interfaccia di risolvi.TriangolareInferiore, quindi si usa al posto
+        del risolutore triangolare nei metodi di Gauss-Seidel.
+
+        INPUT:
+        A: matrice sparsa quadrata con diagonale non nulla.
+        thread: numero di thread per i prodotti di ogni colore (vedi matriceParallela).
+    """
+
+    def __init__(self, A, thread=1):
+        A = sp.csr_matrix(A)
+        n = A.shape[0]
+        self.colori = colorazioneGreedy(A)
+        self.nColori = int(self.colori.max(initial=-1)) + 1
+        D = A.diagonal()
+        if np.any(D == 0):
+            raise ValueError("Nella diagonale della matrice sono presenti valori uguali a 0 ")
+
+        righeOrdinate = np.argsort(self.colori, kind='stable')
+        bordi = np.searchsorted(self.colori[righeOrdinate], np.arange(self.nColori + 1))
+        # per ogni riga solo gli elementi nelle colonne di colore precedente
+        righe = np.repeat(np.arange(n), np.diff(A.indptr))
+        E = A.copy()
+        E.data = np.where(self.colori[A.indices] < self.colori[righe], A.data, 0.0)
+        E.eliminate_zeros()
+
+        self.piano = []
+        for c in range(self.nColori):
+            righe_c = righeOrdinate[bordi[c]:bordi[c + 1]]
+            E_c = E[righe_c]
+            if thread > 1:
+                E_c = MatriceParallela(E_c, thread)
+            self.piano.append((righe_c, E_c, 1.0 / D[righe_c]))
+        self._buffer = np.empty(n)
+
+    def solve(self, r, out=None):
+        """
+            Calcola dx = (D + L_c)^-1 r (scritto in out se fornito); r può essere
+            anche una matrice n x k C-contigua.
+        """
+        r = np.asarray(r, dtype=np.float64)
+        if out is None:
+            out = np.empty_like(r)
+        out.fill(0.0)
+        buffer = self._buffer if r.ndim == 1 else np.empty_like(r)
+        for righe_c, E_c, D_inv in self.piano:
+            b = ri.prodotto(E_c, out, buffer[:righe_c.shape[0]])
+            np.subtract(r[righe_c], b, out=b)
+            if r.ndim == 1:
+                out[righe_c] = b * D_inv
+            else:
+                out[righe_c] = b * D_inv[:, None]
+        return out
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _colorazioneNumba(n, indptr, indices):
+        colori = np.full(n, -1, dtype=np.int64)
+        # vietato[c] == i se il colore c è usato da un vicino della riga i
+        vietato = np.full(n + 1, -1, dtype=np.int64)
+        for i in range(n):
+            for p in range(indptr[i], indptr[i + 1]):
+                c = colori[indices[p]]
+                if c >= 0:
+                    vietato[c] = i
+            c = 0
+            while vietato[c] == i:
+                c += 1
+            colori[i] = c
+        return colori
@@ -1,5 +1,17 @@
+import hashlib
+from collections import OrderedDict
+
 import numpy as np
 import scipy.sparse as sp
+import scipy.sparse.linalg  # noqa: F401  (rende disponibile sp.linalg)
+
+# Numero massimo di iterazioni di ARPACK nella stima dell'autovalore minimo.
+MAXITE_AUTOVALORI = 1000
+# Numero massimo di esiti dei controlli memorizzati (i meno recenti vengono scartati).
+MAX_VERDETTI = 32
+
+# esito di controlloGradientePossibile per impronta della matrice (None = controlli superati)
+_verdetti = OrderedDict()
 
 def controlliDim(A,x):
     """
@@ -25,42 +37,188 @@ def controlliDim(A,x):
     elif l != m:
         raise ValueError("Le dimensioni della matrice non corrispondono a quelle del vettore x")
 
+def impronta(A):
+    """
+        Calcola un'impronta economica (O(nnz)) della matrice sparsa A, usata come chiave
+        per non ripetere i controlli su matrici già verificate.
+
+        INPUT:
+        A: matrice sparsa, oppure un operatore con un proprio metodo impronta()
+           (es. matriceMappata.MatriceMappata, per non rileggere gli array dal disco).
+
+        OUTPUT:
+        chiave: tupla (forma, nnz, hash degli array CSR).
+    """
+    if not sp.issparse(A) and hasattr(A, 'impronta'):
+        return A.impronta()
+    A = sp.csr_matrix(A)
+    h = hashlib.blake2b(digest_size=16)
+    for array in (A.indptr, A.indices, A.data):
+        h.update(np.ascontiguousarray(array).view(np.uint8))
+    return A.shape, A.nnz, h.hexdigest()
+
 def is_positive_definite(A):
     """
-        Verifica se la matrice A è definita positiva.
+        Verifica se la matrice simmetrica A è definita positiva.
+
+        Prima si usa il test sufficiente di Gershgorin (diagonale positiva e dominante):
+        se non basta si fattorizza A senza scambi di righe (vedi _certificatoFattorizzazione),
+        che decide esattamente, a meno degli errori di arrotondamento, se A è definita positiva.
+
+        Per gli operatori che non sono matrici sparse in memoria (es. matrici mappate
+        su disco) si salta il test di Gershgorin e si stima l'autovalore più piccolo con
+        il solo prodotto A @ v; se la stima non converge la verifica resta indecisa e sarà
+        il gradiente coniugato a rifiutare la matrice (d^T A d <= 0).
 
         INPUT:
-        A: matrice sparsa quadrata.
+        A: matrice sparsa quadrata simmetrica.
+
+        OUTPUT:
+        verificata: True se A è certamente definita positiva, False se non si è potuto decidere.
+
+        Solvable:
+        ValueError: se A non è definita positiva.
+    """
+    if not sp.issparse(A) and hasattr(A, 'tocsr'):
+        A = A.tocsr()
+    operatore = not sp.issparse(A) and hasattr(A, 'prodotto')
+    if not operatore:
+        A = sp.csr_matrix(A)
+    diag = A.diagonal()
+    if np.any(diag <= 0):
+        raise ValueError("La matrice non è definita positiva")
+    if operatore:
+        return _autovaloreMinimoPositivo(sp.linalg.LinearOperator(A.shape, matvec=A.__matmul__, dtype=np.float64))
+
+    # raggio dei cerchi di Gershgorin: somma dei moduli fuori diagonale di ogni riga
+    righe = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    raggi = np.bincount(righe, weights=np.abs(A.data), minlength=A.shape[0]) - np.abs(diag)
+    if np.all(diag - raggi > 0):
+        return True
+    try:
+        return _certificatoFattorizzazione(A)
+    except MemoryError:
+        # fattorizzazione troppo costosa: si ripiega sulla stima dell'autovalore minimo
+        return _autovaloreMinimoPositivo(A)
+
+def _certificatoFattorizzazione(A):
+    """
+        Fattorizza P A P^T = L U con sp.linalg.splu usando solo pivot diagonali
+        (riordinamento simmetrico, diag_pivot_thresh=0). Per il teorema di Sylvester
+        la matrice simmetrica A è definita positiva se e solo se tutti i pivot, cioè
+        la diagonale di U, sono positivi. Un pivot nullo (fattorizzazione singolare o
+        scambio di righe forzato) esclude che A sia definita positiva.
+
+        OUTPUT:
+        verificata: True (A è definita positiva).
 
         Solvable:
         ValueError: se A non è definita positiva.
     """
-    if not np.all(sp.linalg.eigs(A)[0]) > 0:
+    try:
+        lu = sp.linalg.splu(sp.csc_matrix(A), permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0,
+                            options=dict(SymmetricMode=True))
+    except RuntimeError:
+        # fattore esattamente singolare
+        raise ValueError("La matrice non è definita positiva")
+    if not np.array_equal(lu.perm_r, lu.perm_c) or np.any(lu.U.diagonal() <= 0):
+        raise ValueError("La matrice non è definita positiva")
+    return True
+
+def _autovaloreMinimoPositivo(A):
+    """
+        Stima con sp.linalg.eigsh l'autovalore più piccolo di A, con al più
+        MAXITE_AUTOVALORI iterazioni.
+
+        OUTPUT:
+        verificata: True se la stima converge a un autovalore positivo, False se non converge.
+
+        Solvable:
+        ValueError: se l'autovalore stimato non è positivo.
+    """
+    try:
+        lambda_min = sp.linalg.eigsh(A, k=1, which='SA', maxiter=MAXITE_AUTOVALORI, tol=1e-2,
+                                     return_eigenvectors=False)
+    except sp.linalg.ArpackNoConvergence as e:
+        # un autovalore non positivo trovato prima di fermarsi basta a rifiutare la matrice
+        if np.any(e.eigenvalues <= 0):
+            raise ValueError("La matrice non è definita positiva")
+        return False
+    if np.any(lambda_min <= 0):
         raise ValueError("La matrice non è definita positiva")
+    return True
 
 def is_simmetrica(A):
     """
         Verifica se la matrice A è simmetrica.
 
+        Il confronto avviene direttamente sugli array: gli array CSR di A devono coincidere
+        con quelli CSC (cioè con gli array CSR di A^T), prima la struttura e poi i valori.
+
+        Per gli operatori che non sono matrici sparse in memoria (es. matrici mappate
+        su disco) il confronto diretto richiederebbe di trasporre A, quindi si usa un
+        test probabilistico: u^T (A v) deve coincidere con v^T (A u) per vettori casuali.
+
         INPUT:
         A: matrice sparsa quadrata.
 
         Solvable:
         ValueError: se A non è simmetrica.
     """
-    if (A - A.T).nnz != 0:
+    if not sp.issparse(A) and hasattr(A, 'tocsr'):
+        A = A.tocsr()
+    if not sp.issparse(A) and hasattr(A, 'prodotto'):
+        rng = np.random.default_rng(0)
+        u, v = rng.standard_normal((2, A.shape[0]))
+        Av, Au = A @ v, A @ u
+        if abs(u @ Av - v @ Au) > 1e-10 * np.linalg.norm(u) * np.linalg.norm(Av):
+            raise ValueError("La matrice non è simmetrica")
+        return
+
+    S = sp.csr_matrix(A, copy=True)
+    S.sum_duplicates()
+    S.eliminate_zeros()
+    T = S.tocsc()
+    T.sort_indices()
+    if not (np.array_equal(S.indptr, T.indptr) and np.array_equal(S.indices, T.indices)
+            and np.array_equal(S.data, T.data)):
         raise ValueError("La matrice non è simmetrica")
 
-def controlloGradientePossibile(A):
+def controlloGradientePossibile(A, chiave=None):
     """
         Verifica se è possibile applicare il metodo del gradiente:
         controlla che la matrice sia simmetrica e definita positiva.
+        L'esito viene memorizzato in base all'impronta della matrice, così i controlli
+        non vengono ripetuti quando la stessa matrice viene risolta più volte; le
+        verifiche indecise (vedi is_positive_definite) non vengono memorizzate.
 
         INPUT:
         A: matrice sparsa quadrata.
+        chiave: impronta di A, se già calcolata.
+
+        OUTPUT:
+        verificata: True se A è certamente simmetrica definita positiva, False se la
+                    definita positività non si è potuta decidere (i metodi del gradiente
+                    la controllano allora a ogni iterazione, d^T A d > 0).
 
         Solvable:
         ValueError: se la matrice non è simmetrica o non è definita positiva.
     """
-    is_positive_definite(A)
-    is_simmetrica(A)
\ No newline at end of file
+    if chiave is None:
+        chiave = impronta(A)
+    if chiave not in _verdetti:
+        try:
+            is_simmetrica(A)
+            if not is_positive_definite(A):
+                return False
+            _verdetti[chiave] = None
+        except ValueError as e:
+            _verdetti[chiave] = str(e)
+        if len(_verdetti) > MAX_VERDETTI:
+            _verdetti.popitem(last=False)
+    else:
+        _verdetti.move_to_end(chiave)
+
+    if _verdetti[chiave] is not None:
+        raise ValueError(_verdetti[chiave])
+    return True
@@ -1,8 +1,18 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg  # noqa: F401  (rende disponibile sp.linalg)
+
 import Progetto1.lib.metodiIterativi as mt
+from Progetto1.lib import risolvi as ri
+from Progetto1.lib.cacheSetup import ottieniSetup
 from Progetto1.lib.metodiIterativiMulti import metodiIterativi
+from Progetto1.lib.metodiIterativiBlocco import metodiIterativiBlocco
+from Progetto1.lib.selettore import scegliMetodo
 
 
-def routine(A, b, x, tol):
+def routine(A, b, x, tol, riordina=None):
   """
   Esegue e confronta quattro metodi iterativi (Jacobi, Gauss-Seidel, Gradiente, Gradiente Coniugato)
   per la risoluzione del sistema lineare Ax = b con una data tolleranza.
@@ -16,6 +26,8 @@ def routine(A, b, x, tol):
       Vettore iniziale per l'iterazione.
     tol : float
       Tolleranza per il criterio di arresto (relativo all'errore).
+    riordina : str, opzionale
+      Riordinamento della matrice prima di risolvere (es. 'rcm', vedi riordina).
 
   Returns:
     Jacobi, GaussSeidel, Gradiente, GradienteConiugato : list
@@ -24,7 +36,7 @@ def routine(A, b, x, tol):
   print(f"\nRoutine con tol: {tol}")
 
   # Metodo di Jacobi
-  errR, nIte, time_elapsed = mt.metodo_jacobi(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_jacobi(A, b, x, tol, riordina=riordina)
   Jacobi = [errR, nIte, time_elapsed]
   print("\nMETODO DEL JACOBI")
   print(f"Errore relativo per ogni iterazione: {errR}")
@@ -32,7 +44,7 @@ def routine(A, b, x, tol):
   print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
 
   # Metodo di Gauss-Seidel
-  errR, nIte, time_elapsed = mt.metodo_gaus_seidel(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_gaus_seidel(A, b, x, tol, riordina=riordina)
   GaussSeidel = [errR, nIte, time_elapsed]
   print("\nMETODO DEL GAUSS-SEIDEL")
   print(f"Errore relativo per ogni iterazione: {errR}")
@@ -40,7 +52,7 @@ def routine(A, b, x, tol):
   print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
 
   #Esegue una variante personalizzata del metodo di Gauss-Seidel
-  errR, nIte, time_elapsed = mt.metodo_gaus_seidelMyLU(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_gaus_seidelMyLU(A, b, x, tol, riordina=riordina)
   GaussSeidelMy = [errR, nIte, time_elapsed]
   print("\nMETODO DI GAUSS-SEIDEL CON RISOLUTORE PERSONALIZZATO")
   print(f"Errore relativo per ogni iterazione: {errR}")
@@ -48,7 +60,7 @@ def routine(A, b, x, tol):
   print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
 
   # Metodo del Gradiente
-  errR, nIte, time_elapsed = mt.metodo_gradiente(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_gradiente(A, b, x, tol, riordina=riordina)
   Gradiente = [errR, nIte, time_elapsed]
   print("\nMETODO DEL GRADIENTE")
   print(f"Errore relativo per ogni iterazione: {errR}")
@@ -56,7 +68,7 @@ def routine(A, b, x, tol):
   print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
 
   # Metodo del Gradiente Coniugato
-  errR, nIte, time_elapsed = mt.metodo_gradiente_coniugato(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_gradiente_coniugato(A, b, x, tol, riordina=riordina)
   GradienteConiugato = [errR, nIte, time_elapsed]
   print("\nMETODO DEL GRADIENTE CONIUGATO")
   print(f"Errore relativo per ogni iterazione: {errR}")
@@ -66,12 +78,12 @@ def routine(A, b, x, tol):
   return Jacobi, GaussSeidel, GaussSeidelMy, Gradiente, GradienteConiugato
 
 
-def runJacobi(A, b, x, tol):
+def runJacobi(A, b, x, tol, riordina=None):
   """
   Esegue il metodo di Jacobi per risolvere Ax = b.
   """
   print(f"\nRoutine con tol: {tol}")
-  errR, nIte, time_elapsed = mt.metodo_jacobi(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_jacobi(A, b, x, tol, riordina=riordina)
   print("\nMETODO DEL JACOBI")
   print(f"Errore relativo per ogni iterazione: {errR}")
   print(f"Numero di iterazioni: {nIte}")
@@ -79,12 +91,12 @@ def runJacobi(A, b, x, tol):
   return [errR, nIte, time_elapsed]
 
 
-def runGaussSeidel(A, b, x, tol):
+def runGaussSeidel(A, b, x, tol, riordina=None):
   """
   Esegue il metodo di Gauss-Seidel per risolvere Ax = b.
   """
   print(f"\nRoutine con tol: {tol}")
-  errR, nIte, time_elapsed = mt.metodo_gaus_seidel(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_gaus_seidel(A, b, x, tol, riordina=riordina)
   print("\nMETODO DEL GAUSS-SEIDEL")
   print(f"Errore relativo per ogni iterazione: {errR}")
   print(f"Numero di iterazioni: {nIte}")
@@ -92,12 +104,12 @@ def runGaussSeidel(A, b, x, tol):
   return [errR, nIte, time_elapsed]
 
 
-def runGaussSeidelMySolve(A, b, x, tol):
+def runGaussSeidelMySolve(A, b, x, tol, riordina=None):
   """
   Esegue una variante personalizzata del metodo di Gauss-Seidel
   """
   print(f"\nRoutine con tol: {tol}")
-  errR, nIte, time_elapsed = mt.metodo_gaus_seidelMyLU(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_gaus_seidelMyLU(A, b, x, tol, riordina=riordina)
   print("\nMETODO DI GAUSS-SEIDEL CON RISOLUTORE PERSONALIZZATO")
   print(f"Errore relativo per ogni iterazione: {errR}")
   print(f"Numero di iterazioni: {nIte}")
@@ -105,12 +117,64 @@ def runGaussSeidelMySolve(A, b, x, tol):
   return [errR, nIte, time_elapsed]
 
 
-def runGradiente(A, b, x, tol):
+def runGaussSeidelColori(A, b, x, tol, thread=1, riordina=None):
+  """
+  Esegue il metodo di Gauss-Seidel multicolore per risolvere Ax = b.
+  """
+  print(f"\nRoutine con tol: {tol}")
+  errR, nIte, time_elapsed = mt.metodo_gaus_seidel_colori(A, b, x, tol, thread, riordina=riordina)
+  print("\nMETODO DI GAUSS-SEIDEL MULTICOLORE")
+  print(f"Errore relativo per ogni iterazione: {errR}")
+  print(f"Numero di iterazioni: {nIte}")
+  print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
+  return [errR, nIte, time_elapsed]
+
+
+def runSOR(A, b, x, tol, omega=None, riordina=None):
+  """
+  Esegue il metodo SOR per risolvere Ax = b (omega=None: omega stimato e adattato automaticamente).
+  """
+  print(f"\nRoutine con tol: {tol}")
+  errR, nIte, time_elapsed = mt.metodo_sor(A, b, x, tol, omega, riordina=riordina)
+  print("\nMETODO SOR")
+  print(f"Errore relativo per ogni iterazione: {errR}")
+  print(f"Numero di iterazioni: {nIte}")
+  print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
+  return [errR, nIte, time_elapsed]
+
+
+def runSSOR(A, b, x, tol, omega=None, riordina=None):
+  """
+  Esegue il metodo SSOR per risolvere Ax = b (omega=None: omega stimato automaticamente).
+  """
+  print(f"\nRoutine con tol: {tol}")
+  errR, nIte, time_elapsed = mt.metodo_ssor(A, b, x, tol, omega, riordina=riordina)
+  print("\nMETODO SSOR")
+  print(f"Errore relativo per ogni iterazione: {errR}")
+  print(f"Numero di iterazioni: {nIte}")
+  print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
+  return [errR, nIte, time_elapsed]
+
+
+def runMultigriglia(A, b, x, tol, lisciatore='gauss-seidel', riordina=None):
+  """
+  Esegue il metodo multigriglia algebrico (V-ciclo) per risolvere Ax = b.
+  """
+  print(f"\nRoutine con tol: {tol}")
+  errR, nIte, time_elapsed = mt.metodo_multigriglia(A, b, x, tol, lisciatore, riordina=riordina)
+  print(f"\nMETODO MULTIGRIGLIA ({lisciatore})")
+  print(f"Errore relativo per ogni iterazione: {errR}")
+  print(f"Numero di iterazioni: {nIte}")
+  print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
+  return [errR, nIte, time_elapsed]
+
+
+def runGradiente(A, b, x, tol, riordina=None):
   """
   Esegue il metodo del Gradiente per risolvere Ax = b.
   """
   print(f"\nRoutine con tol: {tol}")
-  errR, nIte, time_elapsed = mt.metodo_gradiente(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_gradiente(A, b, x, tol, riordina=riordina)
   print("\nMETODO DEL GRADIENTE")
   print(f"Errore relativo per ogni iterazione: {errR}")
   print(f"Numero di iterazioni: {nIte}")
@@ -118,19 +182,73 @@ def runGradiente(A, b, x, tol):
   return [errR, nIte, time_elapsed]
 
 
-def runGradienteConiugato(A, b, x, tol):
+def runGradienteConiugato(A, b, x, tol, riordina=None):
   """
   Esegue il metodo del Gradiente Coniugato per risolvere Ax = b.
   """
   print(f"\nRoutine con tol: {tol}")
-  errR, nIte, time_elapsed = mt.metodo_gradiente_coniugato(A, b, x, tol)
+  errR, nIte, time_elapsed = mt.metodo_gradiente_coniugato(A, b, x, tol, riordina=riordina)
   print("\nMETODO DEL GRADIENTE CONIUGATO")
   print(f"Errore relativo per ogni iterazione: {errR}")
   print(f"Numero di iterazioni: {nIte}")
   print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
   return [errR, nIte, time_elapsed]
 
-def routineMulti(A, b, x, tol):
+def runGradienteConiugatoPrecondizionato(A, b, x, tol, precondizionatore='jacobi', riordina=None):
+  """
+  Esegue il metodo del Gradiente Coniugato Precondizionato per risolvere Ax = b.
+  """
+  print(f"\nRoutine con tol: {tol}")
+  errR, nIte, time_elapsed = mt.metodo_gradiente_coniugato_precondizionato(A, b, x, tol, precondizionatore,
+                                                                        riordina=riordina)
+  print(f"\nMETODO DEL GRADIENTE CONIUGATO PRECONDIZIONATO ({precondizionatore})")
+  print(f"Errore relativo per ogni iterazione: {errR}")
+  print(f"Numero di iterazioni: {nIte}")
+  print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
+  return [errR, nIte, time_elapsed]
+
+def runGMRES(A, b, x, tol, riavvio=mt.RIAVVIO, precondizionatore=None, riordina=None):
+  """
+  Esegue il metodo GMRES con riavvio per risolvere Ax = b (anche con A non simmetrica).
+  """
+  print(f"\nRoutine con tol: {tol}")
+  errR, nIte, time_elapsed = mt.metodo_gmres(A, b, x, tol, riavvio, precondizionatore, riordina=riordina)
+  print(f"\nMETODO GMRES({riavvio}) (precondizionatore: {precondizionatore})")
+  print(f"Errore relativo per ogni iterazione: {errR}")
+  print(f"Numero di iterazioni: {nIte}")
+  print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
+  return [errR, nIte, time_elapsed]
+
+
+def runBiCGSTAB(A, b, x, tol, precondizionatore=None, riordina=None):
+  """
+  Esegue il metodo BiCGSTAB per risolvere Ax = b (anche con A non simmetrica).
+  """
+  print(f"\nRoutine con tol: {tol}")
+  errR, nIte, time_elapsed = mt.metodo_bicgstab(A, b, x, tol, precondizionatore, riordina=riordina)
+  print(f"\nMETODO BiCGSTAB (precondizionatore: {precondizionatore})")
+  print(f"Errore relativo per ogni iterazione: {errR}")
+  print(f"Numero di iterazioni: {nIte}")
+  print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
+  return [errR, nIte, time_elapsed]
+
+def runAuto(A, b, x, tol, riordina=None):
+  """
+  Risolve Ax = b con il metodo scelto automaticamente (vedi selettore.scegliMetodo),
+  stampando la scelta e il suo motivo. Con riordina (es. 'rcm') la scelta e la
+  risoluzione avvengono sul sistema riordinato.
+  """
+  print(f"\nRoutine con tol: {tol}")
+  A, b, x, _ = mt._riordina(A, b, x, None, riordina)
+  scelta = scegliMetodo(A, b, tol)
+  errR, nIte, time_elapsed = scelta.esegui(A, b, x, tol)
+  print(f"\nMETODO AUTOMATICO: {scelta}")
+  print(f"Errore relativo per ogni iterazione: {errR}")
+  print(f"Numero di iterazioni: {nIte}")
+  print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
+  return [errR, nIte, time_elapsed]
+
+def routineMulti(A, b, x, tol, riordina=None):
   """
   Esegue e confronta quattro metodi iterativi (Jacobi, Gauss-Seidel, Gradiente, Gradiente Coniugato)
   per la risoluzione del sistema lineare Ax = b con una data tolleranza.
@@ -144,6 +262,8 @@ def routineMulti(A, b, x, tol):
       Vettore iniziale per l'iterazione.
     tol : float
       Tolleranza per il criterio di arresto (relativo all'errore).
+    riordina : str, opzionale
+      Riordinamento della matrice prima di risolvere (es. 'rcm', vedi riordina).
 
   Returns:
     Jacobi, GaussSeidel, Gradiente, GradienteConiugato : list
@@ -154,7 +274,7 @@ def routineMulti(A, b, x, tol):
   nomi_metodi = ["Jacobi", "Gauss-Seidel", "Gradiente", "Gradiente Coniugato"]
   for i in range(1,5):
     # Metodo di Jacobi
-    errR, nIte, time_elapsed = metodiIterativi(A, b, x, tol,i)
+    errR, nIte, time_elapsed = metodiIterativi(A, b, x, tol,i, riordina=riordina)
     risultati.append( [errR, nIte, time_elapsed])
     print(f"\nMETODO DEL {nomi_metodi[i-1]}")
     print(f"Errore relativo per ogni iterazione: {errR}")
@@ -163,3 +283,177 @@ def routineMulti(A, b, x, tol):
 
   return risultati
 
+
+def routineContinuazione(A, b, x, tolleranze, x0=None, riordina=None):
+  """
+  Esegue i cinque metodi della routine una sola volta ciascuno per tutte le tolleranze:
+  ogni metodo itera fino alla tolleranza più stretta registrando errore relativo, numero
+  di iterazioni e tempo trascorso nel momento in cui attraversa ciascuna soglia.
+
+  Args:
+    A : array_like o matrice sparsa
+      Matrice dei coefficienti del sistema lineare.
+    b : array_like
+      Vettore dei termini noti.
+    x : array_like
+      Soluzione esatta (per il calcolo dell'errore).
+    tolleranze : list of float
+      Tolleranze per il criterio di arresto (es. [1e-4, 1e-6, 1e-8, 1e-10]).
+    x0 : array_like, opzionale
+      Soluzione iniziale (di default il vettore nullo).
+    riordina : str, opzionale
+      Riordinamento della matrice prima di risolvere (es. 'rcm', vedi riordina).
+
+  Returns:
+    risultati : dict
+      Per ciascun metodo la lista di [errore_relativo, numero_iterazioni, tempo_trascorso],
+      una per tolleranza nell'ordine dato.
+  """
+  metodi = {
+    "Jacobi": mt.metodo_jacobi,
+    "Gauss-Seidel": mt.metodo_gaus_seidel,
+    "Gauss-Seidel con risolutore personalizzato": mt.metodo_gaus_seidelMyLU,
+    "Gradiente": mt.metodo_gradiente,
+    "Gradiente Coniugato": mt.metodo_gradiente_coniugato,
+  }
+  risultati = {}
+  for nome, metodo in metodi.items():
+    risultati[nome] = metodo(A, b, x, tolleranze, x0=x0, riordina=riordina)
+    print(f"\nMETODO DEL {nome.upper()}")
+    for tol, (errR, nIte, time_elapsed) in zip(tolleranze, risultati[nome]):
+      print(f"tol {tol}: errore relativo {errR}, iterazioni {nIte}, tempo {time_elapsed:.6f} secondi")
+
+  return risultati
+
+
+def routineBlocco(A, B, X, tol, riordina=None):
+  """
+  Esegue i quattro metodi iterativi (Jacobi, Gauss-Seidel, Gradiente, Gradiente Coniugato)
+  in modalità a blocchi, risolvendo insieme i sistemi A x_j = b_j per tutte le colonne di B.
+
+  Args:
+    A : matrice sparsa
+      Matrice dei coefficienti del sistema lineare.
+    B : array_like
+      Matrice n x k dei termini noti.
+    X : array_like
+      Matrice n x k delle soluzioni esatte.
+    tol : float
+      Tolleranza per il criterio di arresto (relativo all'errore).
+    riordina : str, opzionale
+      Riordinamento della matrice prima di risolvere (es. 'rcm', vedi riordina).
+
+  Returns:
+    risultati : list
+      Per ciascun metodo [errori_relativi, numeri_iterazioni, tempo_trascorso],
+      con errori e iterazioni riportati colonna per colonna.
+  """
+  print(f"\nRoutine a blocchi con tol: {tol}")
+  risultati = []
+  nomi_metodi = ["Jacobi", "Gauss-Seidel", "Gradiente", "Gradiente Coniugato"]
+  for i in range(1, 5):
+    errR, nIte, time_elapsed = metodiIterativiBlocco(A, B, X, tol, i, riordina=riordina)
+    risultati.append([errR, nIte, time_elapsed])
+    print(f"\nMETODO DEL {nomi_metodi[i-1]} ({B.shape[1]} termini noti)")
+    print(f"Errore relativo per ogni colonna: {errR}")
+    print(f"Numero di iterazioni per ogni colonna: {nIte}")
+    print(f"Tempo di esecuzione: {time_elapsed:.6f} secondi")
+
+  return risultati
+
+
+def confrontoTriangolare(A, ripetizioni=10):
+  """
+  Confronta i tempi dei risolutori triangolari inferiori disponibili sulla parte
+  triangolare inferiore di A: sostituzione per livelli, kernel numba (se installato)
+  e sp.linalg.spsolve_triangular.
+
+  Args:
+    A : matrice sparsa quadrata
+      Matrice da cui si estrae la parte triangolare inferiore.
+    ripetizioni : int
+      Numero di risoluzioni su cui mediare il tempo.
+
+  Returns:
+    tempi : dict
+      Tempo medio per risoluzione di ciascun risolutore (None se non disponibile).
+  """
+  L = sp.tril(A).tocsr()
+  b = np.random.default_rng(0).random(L.shape[0])
+  x_ref = sp.linalg.spsolve_triangular(L, b, lower=True)
+
+  piani = {"livelli": None, "numba": None}
+  for metodo in piani:
+    if metodo == "numba" and ri.numba is None:
+      continue
+    start = time.time()
+    piani[metodo] = ri.TriangolareInferiore(L, metodo)
+    # per numba la prima risoluzione compila il kernel
+    piani[metodo].solve(b)
+    print(f"\nPreparazione del risolutore {metodo}: {time.time() - start:.6f} secondi")
+
+  out = np.empty(L.shape[0])
+  risolutori = {
+    "livelli": lambda: piani["livelli"].solve(b, out=out),
+    "numba": lambda: piani["numba"].solve(b, out=out),
+    "scipy": lambda: sp.linalg.spsolve_triangular(L, b, lower=True),
+  }
+  if piani["numba"] is None:
+    del risolutori["numba"]
+
+  tempi = {"livelli": None, "numba": None, "scipy": None}
+  print(f"Confronto risolutori triangolari (n = {L.shape[0]}, nnz = {L.nnz})")
+  for nome, risolvi in risolutori.items():
+    start = time.time()
+    for _ in range(ripetizioni):
+      x = risolvi()
+    tempi[nome] = (time.time() - start) / ripetizioni
+    print(f"{nome}: {tempi[nome]:.6f} secondi, errore relativo {ri.errorRelativo(x_ref, x):.2e}")
+
+  return tempi
+
+
+def confrontoRiordinamento(A, b, x, tol, riordina='rcm'):
+  """
+  Confronta i cinque metodi della routine sulla matrice nell'ordine originale e
+  dopo il riordinamento, riportando la larghezza di banda prima e dopo e lo
+  speedup di ciascun metodo (il riordinamento è preparato prima dei tempi misurati).
+
+  Args:
+    A : matrice sparsa
+      Matrice dei coefficienti del sistema lineare.
+    b : array_like
+      Vettore dei termini noti.
+    x : array_like
+      Soluzione esatta (per il calcolo dell'errore).
+    tol : float
+      Tolleranza per il criterio di arresto (relativo all'errore).
+    riordina : str
+      Riordinamento da applicare (vedi riordina.RIORDINAMENTI).
+
+  Returns:
+    risultati : dict
+      Per ciascun metodo la coppia ([errore, iterazioni, tempo] senza riordinamento,
+      [errore, iterazioni, tempo] con riordinamento).
+  """
+  P = ottieniSetup(A).riordinamento(riordina)
+  print(f"\nRiordinamento {riordina}: banda {P.bandaIniziale} -> {P.bandaFinale}")
+
+  metodi = {
+    "Jacobi": mt.metodo_jacobi,
+    "Gauss-Seidel": mt.metodo_gaus_seidel,
+    "Gauss-Seidel con risolutore personalizzato": mt.metodo_gaus_seidelMyLU,
+    "Gradiente": mt.metodo_gradiente,
+    "Gradiente Coniugato": mt.metodo_gradiente_coniugato,
+  }
+  risultati = {}
+  for nome, metodo in metodi.items():
+    originale = list(metodo(A, b, x, tol))
+    riordinato = list(metodo(A, b, x, tol, riordina=riordina))
+    risultati[nome] = (originale, riordinato)
+    print(f"\nMETODO DEL {nome.upper()}")
+    print(f"Iterazioni: {originale[1]} -> {riordinato[1]}")
+    print(f"Tempo di esecuzione: {originale[2]:.6f} -> {riordinato[2]:.6f} secondi "
+          f"(speedup {originale[2] / max(riordinato[2], 1e-12):.2f})")
+
+  return risultati
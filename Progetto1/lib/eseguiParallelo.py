@@ -0,0 +1,164 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+import scipy.sparse as sp
+
+import Progetto1.lib.metodiIterativi as mt
+
+# Metodi eseguiti da routine, nello stesso ordine dei risultati restituiti.
+METODI = ["metodo_jacobi", "metodo_gaus_seidel", "metodo_gaus_seidelMyLU",
+          "metodo_gradiente", "metodo_gradiente_coniugato"]
+
+# Variabili d'ambiente che limitano i thread delle librerie BLAS/OpenMP.
+VARIABILI_THREAD = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                    "BLIS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMBA_NUM_THREADS"]
+
+# matrici già ricostruite dalla memoria condivisa in ogni processo di lavoro
+_matrici = {}
+
+
+def routineParallela(matrici, tolleranze, processi=None, threadBlas=1, continuazione=False):
+  """
+  Esegue routine (Jacobi, Gauss-Seidel, Gauss-Seidel personalizzato, Gradiente,
+  Gradiente Coniugato) su più matrici e tolleranze distribuendo i lavori
+  (matrice, metodo, tolleranza) su un gruppo di processi.
+
+  Le matrici e i vettori vengono copiati una sola volta in memoria condivisa, da cui
+  i processi li leggono senza doverli ricevere serializzati a ogni lavoro; ogni processo
+  usa al più threadBlas thread per le librerie BLAS, per non sovraccaricare i core.
+
+  Args:
+    matrici : dict
+      Per ogni nome di matrice la terna (A, b, x): matrice sparsa, termine noto e
+      soluzione esatta.
+    tolleranze : list of float
+      Tolleranze per il criterio di arresto.
+    processi : int
+      Numero di processi (di default il numero di core).
+    threadBlas : int
+      Numero di thread BLAS per processo.
+    continuazione : bool
+      Se vero ogni metodo viene eseguito una sola volta per matrice su tutte le
+      tolleranze (vedi ri.RegistroTolleranze), invece di un lavoro per tolleranza.
+
+  Returns:
+    risultati : dict
+      risultati[nome][tol] contiene (Jacobi, GaussSeidel, GaussSeidelMy, Gradiente,
+      GradienteConiugato), ciascuno [errore_relativo, numero_iterazioni, tempo_trascorso],
+      come restituito da routine.
+  """
+  condivise = []
+  descrittori = {}
+  try:
+    for nome, (A, b, x) in matrici.items():
+      A = sp.csr_matrix(A)
+      descrittori[nome] = {}
+      for chiave, array in (("indptr", A.indptr), ("indices", A.indices), ("data", A.data),
+                            ("b", np.asarray(b, dtype=np.float64)), ("x", np.asarray(x, dtype=np.float64))):
+        shm, descrittore = _condividi(array)
+        condivise.append(shm)
+        descrittori[nome][chiave] = descrittore
+      descrittori[nome]["shape"] = A.shape
+
+    if continuazione:
+      lavori = [(nome, metodo, list(tolleranze)) for nome in matrici for metodo in METODI]
+    else:
+      lavori = [(nome, metodo, tol) for nome in matrici for metodo in METODI for tol in tolleranze]
+
+    risultati = {nome: {tol: [None] * len(METODI) for tol in tolleranze} for nome in matrici}
+    with _limitaThread(threadBlas):
+      with ProcessPoolExecutor(max_workers=processi, mp_context=get_context("spawn"),
+                               initializer=_inizializzaProcesso,
+                               initargs=(descrittori, threadBlas)) as esecutore:
+        for (nome, metodo, tol), esito in zip(lavori, esecutore.map(_eseguiLavoro, lavori)):
+          i = METODI.index(metodo)
+          if continuazione:
+            for t, risultato in zip(tol, esito):
+              risultati[nome][t][i] = risultato
+          else:
+            risultati[nome][tol][i] = esito
+  finally:
+    for shm in condivise:
+      shm.close()
+      shm.unlink()
+
+  for nome in risultati:
+    for tol in risultati[nome]:
+      risultati[nome][tol] = tuple(risultati[nome][tol])
+  return risultati
+
+
+def _condividi(array):
+  """
+  Copia array in un nuovo blocco di memoria condivisa.
+
+  Returns:
+    shm, descrittore : blocco di memoria condivisa e (nome, forma, tipo) per ricollegarsi.
+  """
+  shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+  copia = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+  copia[...] = array
+  return shm, (shm.name, array.shape, array.dtype.str)
+
+
+class _limitaThread:
+  """
+  Imposta temporaneamente le variabili d'ambiente dei thread BLAS, ereditate dai
+  processi di lavoro avviati all'interno del blocco with.
+  """
+
+  def __init__(self, thread):
+    self.thread = str(thread)
+    self.precedenti = {}
+
+  def __enter__(self):
+    for variabile in VARIABILI_THREAD:
+      self.precedenti[variabile] = os.environ.get(variabile)
+      os.environ[variabile] = self.thread
+    return self
+
+  def __exit__(self, *eccezione):
+    for variabile, valore in self.precedenti.items():
+      if valore is None:
+        os.environ.pop(variabile, None)
+      else:
+        os.environ[variabile] = valore
+    return False
+
+
+def _inizializzaProcesso(descrittori, threadBlas):
+  """
+  Inizializza un processo di lavoro: limita i thread BLAS (anche con threadpoolctl,
+  se installato) e ricostruisce le matrici dalla memoria condivisa.
+  """
+  try:
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(threadBlas)
+  except ImportError:
+    pass
+
+  for nome, descrittore in descrittori.items():
+    array = {}
+    for chiave in ("indptr", "indices", "data", "b", "x"):
+      nome_shm, forma, tipo = descrittore[chiave]
+      shm = shared_memory.SharedMemory(name=nome_shm)
+      array[chiave] = np.ndarray(forma, dtype=np.dtype(tipo), buffer=shm.buf)
+      array[chiave].setflags(write=False)
+      # il riferimento al blocco deve restare vivo finché si usano gli array
+      array["_" + chiave] = shm
+    A = sp.csr_matrix((array["data"], array["indices"], array["indptr"]), shape=descrittore["shape"], copy=False)
+    _matrici[nome] = (A, array["b"], array["x"], array)
+
+
+def _eseguiLavoro(lavoro):
+  """
+  Esegue un metodo della routine su una matrice condivisa.
+  """
+  nome, metodo, tol = lavoro
+  A, b, x, _ = _matrici[nome]
+  esito = getattr(mt, metodo)(A, b, x, tol)
+  if isinstance(tol, list):
+    return esito
+  return list(esito)
@@ -0,0 +1,153 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from Progetto1.lib import risolvi as ri
+from Progetto1.lib.caricaMatrice import SUFFISSO_CACHE, caricaMatrice
+
+# Numero di elementi non nulli (circa) elaborati per ogni blocco di righe.
+DIM_BLOCCO = 1 << 22
+
+
+class MatriceMappata:
+    """
+        Matrice sparsa CSR i cui array indices e data restano su disco, mappati in
+        memoria: il prodotto matrice-vettore scorre le righe a blocchi di circa
+        elementiBlocco elementi non nulli, quindi in RAM restano solo indptr, i vettori
+        e al più due blocchi. Con prefetch=True un thread legge il blocco successivo
+        mentre si calcola quello corrente.
+
+        Può sostituire la matrice sparsa nei metodi che usano solo il prodotto A @ v
+        e la diagonale (Jacobi, gradiente, gradiente coniugato e gradiente coniugato
+        precondizionato con Jacobi).
+
+        INPUT:
+        cartella: cartella con indptr.npy, indices.npy e data.npy (ad esempio la cache
+                  creata da caricaMatrice.caricaMatrice).
+        elementiBlocco: numero indicativo di elementi non nulli per blocco.
+        prefetch: se vero il blocco successivo viene letto in anticipo.
+
+        Solvable:
+        ValueError: se gli array nella cartella non descrivono una matrice CSR.
+    """
+
+    # x @ A con x array NumPy viene delegato a __rmatmul__
+    __array_ufunc__ = None
+
+    def __init__(self, cartella, elementiBlocco=DIM_BLOCCO, prefetch=True):
+        self.cartella = os.path.abspath(cartella)
+        self.indptr = np.load(os.path.join(cartella, 'indptr.npy'))
+        self.indices = np.load(os.path.join(cartella, 'indices.npy'), mmap_mode='r')
+        self.data = np.load(os.path.join(cartella, 'data.npy'), mmap_mode='r')
+        n = self.indptr.shape[0] - 1
+        if self.indices.shape != self.data.shape or self.indptr[-1] != self.data.shape[0]:
+            raise ValueError("Gli array della matrice mappata non sono coerenti")
+        self.shape = (n, n)
+        self.nnz = int(self.indptr[-1])
+        self.dtype = self.data.dtype
+
+        # blocchi di righe con circa elementiBlocco elementi ciascuno (almeno una riga)
+        soglie = np.arange(elementiBlocco, self.nnz, max(int(elementiBlocco), 1))
+        bordi = np.unique(np.r_[0, np.searchsorted(self.indptr, soglie), n])
+        self.blocchi = list(zip(bordi[:-1], bordi[1:]))
+        self._esecutore = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        self._diagonale = None
+
+    def _leggiBlocco(self, k):
+        """
+            Legge in RAM il blocco k: righe (inizio, fine) e array CSR locali.
+        """
+        inizio, fine = self.blocchi[k]
+        p0, p1 = self.indptr[inizio], self.indptr[fine]
+        indptr = (self.indptr[inizio:fine + 1] - p0).astype(self.indices.dtype, copy=False)
+        return inizio, fine, indptr, np.array(self.indices[p0:p1]), np.array(self.data[p0:p1])
+
+    def _scorriBlocchi(self):
+        """
+            Restituisce i blocchi uno dopo l'altro, leggendo in anticipo il successivo.
+        """
+        if self._esecutore is None:
+            for k in range(len(self.blocchi)):
+                yield self._leggiBlocco(k)
+            return
+        futuro = self._esecutore.submit(self._leggiBlocco, 0) if self.blocchi else None
+        for k in range(len(self.blocchi)):
+            blocco = futuro.result()
+            if k + 1 < len(self.blocchi):
+                futuro = self._esecutore.submit(self._leggiBlocco, k + 1)
+            yield blocco
+
+    def prodotto(self, x, out):
+        """
+            Calcola A @ x scrivendolo in out (vettore, oppure matrice C-contigua n x k).
+        """
+        out.fill(0.0)
+        n = self.shape[1]
+        for inizio, fine, indptr, indices, data in self._scorriBlocchi():
+            if x.ndim == 1:
+                ri._csr_matvec(fine - inizio, n, indptr, indices, data, x, out[inizio:fine])
+            else:
+                ri._csr_matvecs(fine - inizio, n, x.shape[1], indptr, indices, data, x, out[inizio:fine])
+        return out
+
+    def __matmul__(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        return self.prodotto(x, np.empty((self.shape[0],) + x.shape[1:]))
+
+    def __rmatmul__(self, x):
+        # x @ A = A^T x: ogni blocco di righe contribuisce con i suoi elementi pesati da x
+        x = np.asarray(x, dtype=np.float64)
+        out = np.zeros(self.shape[1])
+        for inizio, fine, indptr, indices, data in self._scorriBlocchi():
+            pesi = data * np.repeat(x[inizio:fine], np.diff(indptr))
+            out += np.bincount(indices, weights=pesi, minlength=self.shape[1])
+        return out
+
+    def dot(self, x):
+        return self @ x
+
+    def matvec(self, x):
+        return self @ x
+
+    def diagonal(self):
+        """
+            Diagonale di A (calcolata con una sola lettura della matrice).
+        """
+        if self._diagonale is None:
+            diagonale = np.zeros(self.shape[0])
+            for inizio, fine, indptr, indices, data in self._scorriBlocchi():
+                righe = inizio + np.repeat(np.arange(fine - inizio), np.diff(indptr))
+                diag = indices == righe
+                np.add.at(diagonale, righe[diag], data[diag])
+            self._diagonale = diagonale
+        return self._diagonale.copy()
+
+    def impronta(self):
+        """
+            Impronta economica della matrice (vedi controlli.impronta): invece degli
+            array su disco si usano percorso, data di modifica e dimensione dei file.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.cartella.encode())
+        for nome in ('indptr', 'indices', 'data'):
+            stato = os.stat(os.path.join(self.cartella, nome + '.npy'))
+            h.update(f"{stato.st_mtime_ns}:{stato.st_size}".encode())
+        return self.shape, self.nnz, h.hexdigest()
+
+
+def caricaMatriceMappata(percorso, elementiBlocco=DIM_BLOCCO, prefetch=True):
+    """
+        Apre come MatriceMappata un file Matrix Market, creando prima la sua cache
+        binaria se manca o non è aggiornata (vedi caricaMatrice.caricaMatrice).
+
+        INPUT:
+        percorso: percorso del file .mtx.
+        elementiBlocco, prefetch: vedi MatriceMappata.
+
+        OUTPUT:
+        A: matrice mappata in memoria.
+    """
+    caricaMatrice(percorso, cache=True, mmap=True)
+    return MatriceMappata(os.fspath(percorso) + SUFFISSO_CACHE, elementiBlocco, prefetch)
@@ -0,0 +1,108 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+from Progetto1.lib import risolvi as ri
+from Progetto1.lib.controlli import impronta
+
+# Sotto questo numero di elementi non nulli il prodotto viene eseguito senza thread.
+MIN_NNZ_PARALLELO = 50000
+
+
+class MatriceParallela:
+    """
+        Matrice sparsa CSR con prodotto matrice-vettore multithread: le righe sono
+        divise in blocchi con circa lo stesso numero di elementi non nulli e ogni
+        blocco è calcolato da un thread con il kernel CSR di SciPy, che rilascia il GIL.
+        I blocchi scrivono su righe diverse del risultato, quindi non servono lock.
+
+        Può sostituire la matrice sparsa in tutti i metodi di metodiIterativi e
+        metodiIterativiMulti: il prodotto A @ v è parallelo, le altre operazioni
+        (parte triangolare, precondizionatori, controlli) usano la matrice CSR.
+
+        INPUT:
+        A: matrice sparsa quadrata.
+        thread: numero di thread (di default il numero di core).
+        blocchi: numero di blocchi di righe (di default uno per thread).
+    """
+
+    # x @ A con x array NumPy viene delegato a __rmatmul__
+    __array_ufunc__ = None
+
+    def __init__(self, A, thread=None, blocchi=None):
+        self.A = sp.csr_matrix(A)
+        self.shape = self.A.shape
+        self.nnz = self.A.nnz
+        self.dtype = self.A.dtype
+        self.thread = thread or os.cpu_count() or 1
+        blocchi = blocchi or self.thread
+
+        # bordi dei blocchi: righe in cui la somma cumulata degli nnz supera k * nnz / blocchi
+        soglie = np.linspace(0, self.nnz, blocchi + 1)[1:-1]
+        bordi = np.unique(np.r_[0, np.searchsorted(self.A.indptr, soglie), self.shape[0]])
+        self.blocchi = list(zip(bordi[:-1], bordi[1:]))
+        # array CSR locali di ogni blocco: indptr riportato a 0, indices e data come viste
+        self._csrBlocchi = [self._csrLocale(inizio, fine) for inizio, fine in self.blocchi]
+        sequenziale = self.thread == 1 or len(self.blocchi) == 1 or self.nnz < MIN_NNZ_PARALLELO
+        self._esecutore = None if sequenziale else ThreadPoolExecutor(max_workers=self.thread)
+
+    def _csrLocale(self, inizio, fine):
+        """
+            Array CSR delle righe (inizio, fine) di A, come in matriceMappata._leggiBlocco.
+        """
+        A = self.A
+        p0, p1 = A.indptr[inizio], A.indptr[fine]
+        indptr = A.indptr[inizio:fine + 1] - p0
+        return inizio, fine, indptr, A.indices[p0:p1], A.data[p0:p1]
+
+    def _prodottoBlocco(self, blocco, x, out):
+        """
+            Calcola le righe del blocco (inizio, fine, indptr, indices, data) di A @ x.
+        """
+        inizio, fine, indptr, indices, data = blocco
+        out[inizio:fine] = 0.0
+        if x.ndim == 1:
+            ri._csr_matvec(fine - inizio, self.shape[1], indptr, indices, data, x, out[inizio:fine])
+        else:
+            ri._csr_matvecs(fine - inizio, self.shape[1], x.shape[1], indptr, indices, data,
+                            x, out[inizio:fine])
+
+    def prodotto(self, x, out):
+        """
+            Calcola A @ x scrivendolo in out (vettore, oppure matrice C-contigua n x k).
+        """
+        if self._esecutore is None:
+            return ri.prodotto(self.A, x, out)
+        futuri = [self._esecutore.submit(self._prodottoBlocco, blocco, x, out) for blocco in self._csrBlocchi]
+        for futuro in futuri:
+            futuro.result()
+        return out
+
+    def __matmul__(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        return self.prodotto(x, np.empty((self.shape[0],) + x.shape[1:]))
+
+    def __rmatmul__(self, x):
+        return x @ self.A
+
+    def dot(self, x):
+        return self @ x
+
+    def matvec(self, x):
+        return self @ x
+
+    def diagonal(self):
+        return self.A.diagonal()
+
+    def tocsr(self):
+        return self.A
+
+    def impronta(self):
+        """
+            Impronta della matrice (vedi controlli.impronta), distinta da quella della
+            matrice CSR così che la cache dei dati di preparazione conservi l'operatore.
+        """
+        forma, nnz, h = impronta(self.A)
+        return forma, nnz, h + ':parallela'
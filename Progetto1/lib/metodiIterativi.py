@@ -1,13 +1,25 @@
-import scipy.sparse as sp
+import numpy as np
 import time
+from scipy.linalg import solve_triangular
 from Progetto1.lib import risolvi as ri
-from Progetto1.lib.controlli import controlliDim, controlloGradientePossibile
+from Progetto1.lib.cacheSetup import ottieniSetup
+from Progetto1.lib.controlli import controlliDim
 from Progetto1.lib.risolvi import inizializza
 
 MAXITE = 200000
-
-
-def metodo_jacobi(A, b, x, tol):
+# Ogni quante iterazioni gradiente e gradiente coniugato ricalcolano il residuo vero.
+RICALCOLO = 50
+# Numero di iterazioni iniziali durante le quali SOR adatta omega (con omega automatico).
+ADATTAMENTO = 200
+# Ogni quante iterazioni SOR stima il fattore di convergenza e aggiorna omega.
+PASSO_ADATTAMENTO = 10
+# Omega viene aggiornato solo se il fattore di riduzione supera (omega - 1)^FATTORE_ADATTAMENTO.
+FATTORE_ADATTAMENTO = 0.65
+# Dimensione della base di Krylov di GMRES prima del riavvio.
+RIAVVIO = 30
+
+
+def metodo_jacobi(A, b, x, tol, x0=None, riordina=None, storico=None):
     """
         Metodo di Jacobi per la risoluzione di sistemi lineari Ax = b.
 
@@ -15,37 +27,53 @@ def metodo_jacobi(A, b, x, tol):
             A   : matrice dei coefficienti (sparsa, quadrata)
             b   : vettore dei termini noti
             x   : soluzione esatta (per calcolo errore)
-            tol : tolleranza sull'errore relativo del residuo
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
 
         Output:
             err   : errore relativo ||x - x_k|| / ||x||
             nit   : numero di iterazioni effettuate
             tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
     """
     controlliDim(A,x)
-    x_k, r, errR, nIte = inizializza(A, b)
-    start = time.time()
-    D_inv = ri.InverseMatrixDiagonal(A)
-    while (errR >= tol):
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
+    normB = np.linalg.norm(b)
+    # vettori di lavoro allocati una sola volta
+    dx = np.empty(A.shape[0])
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+    D_inv = setup.inversaDiagonale().diagonal()
+    while (errR >= registro.tol):
         if (nIte < MAXITE):
             # aggiorno x_k
-            x_k = x_k + D_inv @ r
+            np.multiply(D_inv, r, out=dx)
+            x_k += dx
             # calcolo il residuo
-            r, errR = ri.errorRelativoResiduo(A, b, x_k)
+            errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
 
             nIte += 1
+            registro.aggiorna(errR, x_k, nIte)
         else:
             raise ValueError("Arrivato al massimo di iterazioni")
 
     stop = time.time()
-    # calcolo il tempo di esecuzione
-    timeIte = stop - start
-    # calcolo errore relativo
-    errRel = ri.errorRelativo(x, x_k)
-    return errRel, nIte, timeIte
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
 
 
-def metodo_gaus_seidelMyLU(A, b, x, tol):
+def metodo_gaus_seidelMyLU(A, b, x, tol, x0=None, riordina=None, storico=None):
     """
         Metodo di Gauss-Seidel per la risoluzione di sistemi lineari Ax = b.
 
@@ -53,40 +81,54 @@ def metodo_gaus_seidelMyLU(A, b, x, tol):
             A   : matrice dei coefficienti (sparsa, quadrata)
             b   : vettore dei termini noti
             x   : soluzione esatta (per calcolo errore)
-            tol : tolleranza sull'errore relativo del residuo
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
 
         Output:
             err   : errore relativo ||x - x_k|| / ||x||
             nit   : numero di iterazioni effettuate
             tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
     """
-    x_k, r, errR, nIte = inizializza(A, b)
-    A = A.tocsr()
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
 
     # estraggo dalla matrice A la matrice triangolare inferirore
-    L = sp.tril(A).tocsr()
-    start = time.time()
-
-    while (errR >= tol):
+    # e preparo una sola volta il risolutore (sostituzione per livelli)
+    L = setup.triangolareInferiore(metodo='livelli')
+    normB = np.linalg.norm(b)
+    dx = np.empty(A.shape[0])
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+
+    while (errR >= registro.tol):
         if (nIte < MAXITE):
             # aggiorno x_k
-            x_k = x_k + ri.SolvTriangularLower(L, r)
+            x_k += L.solve(r, out=dx)
 
             # calcolo il residuo
-            r, errR = ri.errorRelativoResiduo(A, b, x_k)
+            errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
             nIte += 1
+            registro.aggiorna(errR, x_k, nIte)
         else:
             raise ValueError("Arrivato al massimo di iterazioni")
 
     stop = time.time()
-    # calcolo il tempo di esecuzione
-    timeIte = stop - start
-    # calcolo errore relativo
-    errRel = ri.errorRelativo(x, x_k)
-    return errRel, nIte, timeIte
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
 
 
-def metodo_gaus_seidel(A, b, x, tol):
+def metodo_gaus_seidel(A, b, x, tol, x0=None, riordina=None, storico=None):
     """
         Metodo di Gauss-Seidel per la risoluzione di sistemi lineari Ax = b.
         Utilizando
@@ -95,126 +137,841 @@ def metodo_gaus_seidel(A, b, x, tol):
             A   : matrice dei coefficienti (sparsa, quadrata)
             b   : vettore dei termini noti
             x   : soluzione esatta (per calcolo errore)
-            tol : tolleranza sull'errore relativo del residuo
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
 
         Output:
             err   : errore relativo ||x - x_k|| / ||x||
             nit   : numero di iterazioni effettuate
             tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
     """
-    x_k, r, errR, nIte = inizializza(A, b)
-    A = A.tocsr()
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
 
     # estraggo dalla matrice A la matrice triangolare inferirore
-    L = sp.tril(A).tocsr()
-    start = time.time()
+    # e preparo una sola volta il risolutore triangolare
+    L = setup.triangolareInferiore()
+    normB = np.linalg.norm(b)
+    dx = np.empty(A.shape[0])
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+
+    while (errR >= registro.tol):
+        if (nIte < MAXITE):
+            # aggiorno x_k
+            x_k += L.solve(r, out=dx)
+            # calcolo il residuo
+            errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            nIte += 1
+            registro.aggiorna(errR, x_k, nIte)
+        else:
+            raise ValueError("Arrivato al massimo di iterazioni")
+
+    stop = time.time()
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
+
+
+def metodo_gaus_seidel_colori(A, b, x, tol, thread=1, x0=None, riordina=None, storico=None):
+    """
+        Metodo di Gauss-Seidel multicolore per la risoluzione di sistemi lineari Ax = b.
+        Le incognite sono raggruppate per colore (colorazione greedy del grafo di A,
+        calcolata una sola volta) e ogni colore viene aggiornato in blocco con un prodotto
+        matrice-vettore, invece di una sostituzione in avanti riga per riga
+        (vedi colorazione.GaussSeidelColori).
+
+        Input:
+            A   : matrice dei coefficienti (sparsa, quadrata)
+            b   : vettore dei termini noti
+            x   : soluzione esatta (per calcolo errore)
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            thread : numero di thread per i prodotti di ogni colore
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
+
+        Output:
+            err   : errore relativo ||x - x_k|| / ||x||
+            nit   : numero di iterazioni effettuate
+            tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
+    """
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
+
+    # colorazione e blocchi di ogni colore preparati una sola volta
+    G = setup.gaussSeidelColori(thread)
+    normB = np.linalg.norm(b)
+    dx = np.empty(A.shape[0])
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+
+    while (errR >= registro.tol):
+        if (nIte < MAXITE):
+            # aggiorno x_k
+            x_k += G.solve(r, out=dx)
+            # calcolo il residuo
+            errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            nIte += 1
+            registro.aggiorna(errR, x_k, nIte)
+        else:
+            raise ValueError("Arrivato al massimo di iterazioni")
+
+    stop = time.time()
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
+
+
+def metodo_sor(A, b, x, tol, omega=None, adattamento=ADATTAMENTO, x0=None, riordina=None, storico=None):
+    """
+        Metodo SOR (Successive Over-Relaxation) per la risoluzione di sistemi lineari Ax = b:
+        x_{k+1} = x_k + (D/omega + E)^-1 r_k, con E parte strettamente inferiore di A
+        (omega = 1 è Gauss-Seidel).
+
+        Con omega automatico si parte da omega = 2 / (1 + sqrt(1 - rho^2)), con rho stima
+        del raggio spettrale della matrice di iterazione di Jacobi (vedi
+        ri.raggioSpettraleJacobi); durante le prime iterazioni il fattore di riduzione
+        osservato lambda delle correzioni aggiorna la stima mu del raggio spettrale di
+        Jacobi tramite la relazione (lambda + omega - 1)^2 = lambda omega^2 mu^2.
+
+        Input:
+            A   : matrice dei coefficienti (sparsa, quadrata)
+            b   : vettore dei termini noti
+            x   : soluzione esatta (per calcolo errore)
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            omega : parametro di rilassamento, 0 < omega < 2 (None = automatico)
+            adattamento : numero di iterazioni iniziali in cui adattare omega automatico
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
+
+        Output:
+            err   : errore relativo ||x - x_k|| / ||x||
+            nit   : numero di iterazioni effettuate
+            tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
+    """
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
+
+    automatico = omega is None
+    if automatico:
+        mu = setup.raggioSpettraleJacobi()
+        omega = omegaSOR(mu)
+    S = setup.rilassamento()
+    S.impostaOmega(omega)
+    normB = np.linalg.norm(b)
+    dx = np.empty(A.shape[0])
+    normaPrecedente = None
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+
+    while (errR >= registro.tol):
+        if (nIte < MAXITE):
+            # aggiorno x_k
+            x_k += S.L.solve(r, out=dx)
+            # calcolo il residuo
+            errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            nIte += 1
+
+            if automatico and nIte <= adattamento and nIte % PASSO_ADATTAMENTO == 0:
+                norma = np.linalg.norm(dx)
+                if normaPrecedente:
+                    # fattore medio di riduzione delle correzioni nelle ultime iterazioni
+                    lam = (norma / normaPrecedente) ** (1 / PASSO_ADATTAMENTO)
+                    # vicino all'ottimo il fattore si avvicina a omega - 1 e non dà più
+                    # informazioni affidabili su mu (criterio di Hageman-Young)
+                    if (omega - 1) ** FATTORE_ADATTAMENTO < lam < 1:
+                        mu2 = (lam + omega - 1) ** 2 / (lam * omega ** 2)
+                        if mu ** 2 < mu2 < 1:
+                            mu = np.sqrt(mu2)
+                            omega = omegaSOR(mu)
+                            S.impostaOmega(omega)
+                            # la prossima stima parte da correzioni calcolate con il nuovo omega
+                            norma = None
+                normaPrecedente = norma
+            registro.aggiorna(errR, x_k, nIte)
+        else:
+            raise ValueError("Arrivato al massimo di iterazioni")
+
+    stop = time.time()
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
+
+
+def metodo_ssor(A, b, x, tol, omega=None, x0=None, riordina=None, storico=None):
+    """
+        Metodo SSOR (Symmetric SOR) per la risoluzione di sistemi lineari Ax = b: ogni
+        iterazione è un passo di SOR in avanti seguito da uno all'indietro, cioè
+        x_{k+1} = x_k + M^-1 r_k con M = 1/(2-omega) (D/omega + E) (D/omega)^-1 (D/omega + F)
+        (vedi precondizionatori.PrecondizionatoreSSOR).
+
+        Con omega automatico si usa la stima omega = 2 / (1 + sqrt(2 (1 - rho))), con rho
+        stima del raggio spettrale della matrice di iterazione di Jacobi.
+
+        Input:
+            A   : matrice dei coefficienti (sparsa, quadrata)
+            b   : vettore dei termini noti
+            x   : soluzione esatta (per calcolo errore)
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            omega : parametro di rilassamento, 0 < omega < 2 (None = automatico)
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
 
-    while (errR >= tol):
+        Output:
+            err   : errore relativo ||x - x_k|| / ||x||
+            nit   : numero di iterazioni effettuate
+            tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
+    """
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
+
+    if omega is None:
+        omega = omegaSSOR(setup.raggioSpettraleJacobi())
+    S = setup.rilassamento()
+    S.impostaOmega(omega)
+    normB = np.linalg.norm(b)
+    dx = np.empty(A.shape[0])
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+
+    while (errR >= registro.tol):
         if (nIte < MAXITE):
             # aggiorno x_k
-            #x_k= x_k + ri.SolvTriangularLower(L, r)
-            x_k = x_k + sp.linalg.spsolve_triangular(L, r, lower=True)
-            # x_k= sp.linalg.spsolve_triangular(L, b - M @ x_k)
+            x_k += S.solve(r, out=dx)
+            # calcolo il residuo
+            errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            nIte += 1
+            registro.aggiorna(errR, x_k, nIte)
+        else:
+            raise ValueError("Arrivato al massimo di iterazioni")
+
+    stop = time.time()
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
+
+
+def omegaSOR(rho):
+    """
+        Parametro di rilassamento ottimo di SOR (teoria di Young, matrici consistentemente
+        ordinate) dato il raggio spettrale rho della matrice di iterazione di Jacobi.
+    """
+    rho = min(rho, 1 - 1e-12)
+    return 2 / (1 + np.sqrt(1 - rho ** 2))
+
+
+def omegaSSOR(rho):
+    """
+        Stima del parametro di rilassamento di SSOR dato il raggio spettrale rho della
+        matrice di iterazione di Jacobi.
+    """
+    rho = min(rho, 1 - 1e-12)
+    return 2 / (1 + np.sqrt(2 * (1 - rho)))
+
+
+def metodo_multigriglia(A, b, x, tol, lisciatore='gauss-seidel', x0=None, riordina=None, storico=None):
+    """
+        Metodo multigriglia algebrico per la risoluzione di sistemi lineari Ax = b:
+        ogni iterazione è un V-ciclo sull'errore, x_{k+1} = x_k + V(r_k), con la
+        gerarchia ad aggregazione smussata di multigriglia.Multigriglia. La gerarchia
+        viene costruita una sola volta per matrice (cache dei dati di preparazione) ed
+        è condivisa con il precondizionatore 'amg' del gradiente coniugato precondizionato.
+
+        Input:
+            A   : matrice dei coefficienti (sparsa, quadrata, simmetrica definita positiva)
+            b   : vettore dei termini noti
+            x   : soluzione esatta (per calcolo errore)
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            lisciatore : 'gauss-seidel' oppure 'jacobi' (Jacobi smorzato)
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
+
+        Output:
+            err   : errore relativo ||x - x_k|| / ||x||
+            nit   : numero di iterazioni effettuate
+            tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
+    """
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
+
+    V = setup.precondizionatore('amg' if lisciatore == 'gauss-seidel' else 'amg-' + lisciatore)
+    normB = np.linalg.norm(b)
+    dx = np.empty(A.shape[0])
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+
+    while (errR >= registro.tol):
+        if (nIte < MAXITE):
+            # aggiorno x_k con un V-ciclo sul residuo
+            x_k += V.solve(r, out=dx)
             # calcolo il residuo
-            r, errR = ri.errorRelativoResiduo(A, b, x_k)
+            errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
             nIte += 1
+            registro.aggiorna(errR, x_k, nIte)
         else:
             raise ValueError("Arrivato al massimo di iterazioni")
 
     stop = time.time()
-    # calcolo il tempo di esecuzione
-    timeIte = stop - start
-    # calcolo errore relativo
-    errRel = ri.errorRelativo(x, x_k)
-    return errRel, nIte, timeIte
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
 
 
-def metodo_gradiente(A, b, x, tol):
+def metodo_gradiente(A, b, x, tol, ricalcolo=RICALCOLO, x0=None, riordina=None, storico=None):
     """
      Metodo del gradiente per la risoluzione di Ax = b.
+     Il residuo è aggiornato con la ricorrenza r_{k+1} = r_k - alpha * A r_k,
+     quindi ogni iterazione esegue un solo prodotto matrice-vettore.
      INPUT:
          A    : matrice del sistema
          b    : termine noto
          x    : soluzione esatta
-         tol  : tolleranza
+         tol  : tolleranza, oppure lista di tolleranze registrate in un'unica
+                esecuzione (vedi ri.RegistroTolleranze)
+         ricalcolo : ogni quante iterazioni ricalcolare il residuo vero b - A x_k
+                     per limitare la deriva della ricorrenza (0 = mai)
+         x0   : soluzione iniziale (opzionale, di default il vettore nullo)
+         riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                    (opzionale, vedi _riordina)
+         storico : ogni quante iterazioni registrare la storia della convergenza,
+                   oppure un oggetto ri.Storico (opzionale)
      OUTPUT:
          err  : errore relativo finale
          nit  : numero di iterazioni
          tempo: tempo impiegato
+         (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+         (con storico: la coppia (risultati, ri.Storico))
      """
-    x_k, r, errR, nIte = inizializza(A, b)
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
 
     #verifico se è possibile eseguire il metodo del gradiente
     controlliDim(A,x)
-    controlloGradientePossibile(A)
+    setup.controlloGradientePossibile()
 
-    start = time.time()
-    while (errR >= tol):
+    normB = np.linalg.norm(b)
+    # vettori di lavoro allocati una sola volta
+    Ar = np.empty(A.shape[0])
+    dx = np.empty(A.shape[0])
+
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+    while (errR >= registro.tol):
         if (nIte < MAXITE):
             # aggiorno x_k
-            rt=r.T
-            alpha = (rt @ r) / (rt @ A @ r)
-            x_k = x_k + alpha * r
-            # calcolo il residuo
-            r, errR = ri.errorRelativoResiduo(A, b, x_k)
+            ri.prodotto(A, r, Ar)
+            rAr = r @ Ar
+            # la matrice non è definita positiva (se i controlli non hanno potuto deciderlo)
+            if rAr <= 0:
+                raise ValueError("La matrice non è definita positiva")
+            alpha = (r @ r) / rAr
+            np.multiply(r, alpha, out=dx)
+            x_k += dx
             nIte += 1
+            # calcolo il residuo
+            if ricalcolo and nIte % ricalcolo == 0:
+                errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            else:
+                np.multiply(Ar, alpha, out=dx)
+                r -= dx
+                errR = np.linalg.norm(r) / normB
+                if errR < registro.tol:
+                    # verifico la convergenza sul residuo vero
+                    errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            registro.aggiorna(errR, x_k, nIte)
         else:
             raise ValueError("Arrivato al massimo di iterazioni")
 
     stop = time.time()
-    # calcolo il tempo di esecuzione
-    timeIte = stop - start
-    # calcolo errore relativo
-    errRel = ri.errorRelativo(x, x_k)
-    return errRel, nIte, timeIte
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
 
 
-def metodo_gradiente_coniugato(A, b, x, tol):
+def metodo_gradiente_coniugato(A, b, x, tol, ricalcolo=RICALCOLO, x0=None, riordina=None, storico=None):
     """
         Metodo del gradiente coniugato per la risoluzione di Ax = b.
+        Il residuo è aggiornato con la ricorrenza r_{k+1} = r_k - alpha * A d_k e
+        beta = (r_{k+1} r_{k+1}) / (r_k r_k), quindi ogni iterazione esegue un solo
+        prodotto matrice-vettore.
 
         Input:
             A   : matrice dei coefficienti (simmetrica definita positiva)
             b   : vettore dei termini noti
             x   : soluzione esatta (per calcolo errore)
-            tol : tolleranza sull'errore relativo del residuo
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            ricalcolo : ogni quante iterazioni ricalcolare il residuo vero b - A x_k
+                        per limitare la deriva della ricorrenza (0 = mai)
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
 
         Output:
             err   : errore relativo ||x - x_k|| / ||x||
             nit   : numero di iterazioni effettuate
             tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
     """
-    x_k, r, errR, nIte = inizializza(A, b)
-    A = A.tocsr()
-    d = r
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
+    d = r.copy()
     # verifico se è possibile eseguire il metodo del gradiente
     controlliDim(A, x)
-    controlloGradientePossibile(A)
+    setup.controlloGradientePossibile()
 
-    start = time.time()
-    while (errR >= tol):
+    normB = np.linalg.norm(b)
+    # vettori di lavoro allocati una sola volta
+    Ad = np.empty(A.shape[0])
+    dx = np.empty(A.shape[0])
+    rr = r @ r
+
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+    while (errR >= registro.tol):
         if (nIte < MAXITE):
-            denominatore = d @ (A @ d)
-            alpha = (r @ r) / denominatore
+            ri.prodotto(A, d, Ad)
+            dAd = d @ Ad
+            # la matrice non è definita positiva (se i controlli non hanno potuto deciderlo)
+            if dAd <= 0:
+                raise ValueError("La matrice non è definita positiva")
+            alpha = rr / dAd
+
+            np.multiply(d, alpha, out=dx)
+            x_k += dx
+            nIte += 1
+
+            # calcolo il residuo
+            if ricalcolo and nIte % ricalcolo == 0:
+                errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            else:
+                np.multiply(Ad, alpha, out=dx)
+                r -= dx
+                errR = np.linalg.norm(r) / normB
+                if errR < registro.tol:
+                    # verifico la convergenza sul residuo vero
+                    errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+
+            rr_nuovo = r @ r
+            beta = rr_nuovo / rr
+            rr = rr_nuovo
+            d *= beta
+            d += r
+            registro.aggiorna(errR, x_k, nIte)
+        else:
+            raise ValueError("Arrivato al massimo di iterazioni")
+
+    stop = time.time()
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
 
-            x_k = x_k + alpha * d
+
+def metodo_gradiente_coniugato_precondizionato(A, b, x, tol, precondizionatore='jacobi', ricalcolo=RICALCOLO,
+                                              x0=None, riordina=None, storico=None):
+    """
+        Metodo del gradiente coniugato precondizionato per la risoluzione di Ax = b.
+        A ogni iterazione si risolve M z = r con il precondizionatore scelto; come nel
+        gradiente coniugato viene eseguito un solo prodotto matrice-vettore.
+
+        Input:
+            A   : matrice dei coefficienti (simmetrica definita positiva)
+            b   : vettore dei termini noti
+            x   : soluzione esatta (per calcolo errore)
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            precondizionatore : 'jacobi', 'ssor', 'ic0', 'ilu', 'amg', 'amg-jacobi' oppure un oggetto con
+                                metodo solve(r, out=None) (vedi precondizionatori)
+            ricalcolo : ogni quante iterazioni ricalcolare il residuo vero b - A x_k
+                        per limitare la deriva della ricorrenza (0 = mai)
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
+
+        Output:
+            err   : errore relativo ||x - x_k|| / ||x||
+            nit   : numero di iterazioni effettuate
+            tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
+    """
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
+    # verifico se è possibile eseguire il metodo del gradiente
+    controlliDim(A, x)
+    setup.controlloGradientePossibile()
+
+    M = setup.precondizionatore(precondizionatore)
+
+    normB = np.linalg.norm(b)
+    # vettori di lavoro allocati una sola volta
+    Ad = np.empty(A.shape[0])
+    dx = np.empty(A.shape[0])
+    z = np.empty(A.shape[0])
+    M.solve(r, out=z)
+    d = z.copy()
+    rz = r @ z
+
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+    while (errR >= registro.tol):
+        if (nIte < MAXITE):
+            ri.prodotto(A, d, Ad)
+            dAd = d @ Ad
+            # la matrice non è definita positiva (se i controlli non hanno potuto deciderlo)
+            if dAd <= 0:
+                raise ValueError("La matrice non è definita positiva")
+            alpha = rz / dAd
+
+            np.multiply(d, alpha, out=dx)
+            x_k += dx
+            nIte += 1
 
             # calcolo il residuo
-            r, errR = ri.errorRelativoResiduo(A, b, x_k)
+            if ricalcolo and nIte % ricalcolo == 0:
+                errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            else:
+                np.multiply(Ad, alpha, out=dx)
+                r -= dx
+                errR = np.linalg.norm(r) / normB
+                if errR < registro.tol:
+                    # verifico la convergenza sul residuo vero
+                    errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+
+            # applico il precondizionatore al nuovo residuo
+            M.solve(r, out=z)
+            rz_nuovo = r @ z
+            beta = rz_nuovo / rz
+            rz = rz_nuovo
+            d *= beta
+            d += z
+            registro.aggiorna(errR, x_k, nIte)
+        else:
+            raise ValueError("Arrivato al massimo di iterazioni")
+
+    stop = time.time()
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
+
 
-            beta = ((d @ A) @ r) / denominatore
-            d = r - beta * d
+def metodo_gmres(A, b, x, tol, riavvio=RIAVVIO, precondizionatore=None, x0=None, riordina=None, storico=None):
+    """
+        Metodo GMRES con riavvio, GMRES(m), per sistemi lineari Ax = b con A qualsiasi
+        (non singolare). A ogni ciclo si costruisce con Arnoldi una base ortonormale di
+        al più m vettori dello spazio di Krylov del residuo e si sceglie x_k che
+        minimizza ||b - A x_k||; le rotazioni di Givens danno la norma del residuo a ogni
+        passo senza calcolare x_k, che viene aggiornato a fine ciclo.
+        Il precondizionatore è applicato a destra (A M^-1 y = b, x = M^-1 y), quindi il
+        criterio di arresto resta sul residuo vero. La base è allocata una sola volta.
+
+        Input:
+            A   : matrice dei coefficienti (sparsa, quadrata)
+            b   : vettore dei termini noti
+            x   : soluzione esatta (per calcolo errore)
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            riavvio : dimensione massima della base di Krylov (m)
+            precondizionatore : None (nessuno), 'jacobi', 'ssor', 'ilu', ... oppure un
+                                oggetto con metodo solve(r, out=None) (vedi precondizionatori)
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
+
+        Output:
+            err   : errore relativo ||x - x_k|| / ||x||
+            nit   : numero di iterazioni effettuate (passi di Arnoldi, un prodotto A v ciascuno)
+            tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
+    """
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
+    controlliDim(A, x)
+
+    M = None if precondizionatore is None else setup.precondizionatore(precondizionatore)
+
+    n = A.shape[0]
+    m = min(riavvio, n)
+    normB = np.linalg.norm(b)
+    # base di Krylov, matrice di Hessenberg e rotazioni di Givens allocate una sola volta
+    V = np.empty((m + 1, n))
+    H = np.zeros((m + 1, m))
+    cs = np.empty(m)
+    sn = np.empty(m)
+    g = np.empty(m + 1)
+    w = np.empty(n)
+    z = np.empty(n)
+
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+    while (errR >= registro.tol):
+        beta = np.linalg.norm(r)
+        np.divide(r, beta, out=V[0])
+        g.fill(0.0)
+        g[0] = beta
+        j = 0
+        while j < m and errR >= registro.tol:
+            if (nIte < MAXITE):
+                # w = A M^-1 v_j, ortogonalizzato rispetto alla base (Gram-Schmidt classico ripetuto due volte)
+                ri.prodotto(A, _precondiziona(M, V[j], z), w)
+                h = V[:j + 1] @ w
+                w -= h @ V[:j + 1]
+                h2 = V[:j + 1] @ w
+                w -= h2 @ V[:j + 1]
+                H[:j + 1, j] = h + h2
+                H[j + 1, j] = np.linalg.norm(w)
+                if H[j + 1, j] != 0:
+                    np.divide(w, H[j + 1, j], out=V[j + 1])
+
+                # rotazioni di Givens precedenti e nuova rotazione sulla colonna j
+                for i in range(j):
+                    hi = cs[i] * H[i, j] + sn[i] * H[i + 1, j]
+                    H[i + 1, j] = -sn[i] * H[i, j] + cs[i] * H[i + 1, j]
+                    H[i, j] = hi
+                denom = np.hypot(H[j, j], H[j + 1, j])
+                cs[j] = H[j, j] / denom
+                sn[j] = H[j + 1, j] / denom
+                H[j, j] = denom
+                H[j + 1, j] = 0.0
+                g[j + 1] = -sn[j] * g[j]
+                g[j] *= cs[j]
+
+                # norma del residuo dopo j + 1 passi
+                errR = abs(g[j + 1]) / normB
+                j += 1
+                nIte += 1
+                # nella storia il residuo stimato (x_k viene aggiornato solo a fine ciclo)
+                registro.campiona(errR, None, nIte)
+                if registro.tol <= errR < registro.soglia():
+                    # soglia intermedia attraversata a metà ciclo: la registro con la soluzione
+                    # corrente senza interrompere il ciclo (i cicli restano quelli di una sola tolleranza)
+                    registro.aggiorna(errR, x_k + _correzioneGmres(H, g, V, j, M, w, z), nIte)
+            else:
+                raise ValueError("Arrivato al massimo di iterazioni")
+
+        # aggiorno x_k con la combinazione della base che minimizza il residuo
+        x_k += _correzioneGmres(H, g, V, j, M, w, z)
+        # calcolo il residuo vero (riavvio)
+        errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+        registro.aggiorna(errR, x_k, nIte)
+
+    stop = time.time()
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
+
+
+def metodo_bicgstab(A, b, x, tol, precondizionatore=None, ricalcolo=RICALCOLO, x0=None, riordina=None, storico=None):
+    """
+        Metodo BiCGSTAB (gradiente biconiugato stabilizzato) per sistemi lineari Ax = b
+        con A qualsiasi (non singolare). Ogni iterazione esegue due prodotti
+        matrice-vettore e usa memoria costante, a differenza di GMRES.
+        Il precondizionatore è applicato a destra, quindi il criterio di arresto resta
+        sul residuo vero; in caso di breakdown (rho o omega nulli) il metodo riparte
+        dal residuo corrente.
+
+        Input:
+            A   : matrice dei coefficienti (sparsa, quadrata)
+            b   : vettore dei termini noti
+            x   : soluzione esatta (per calcolo errore)
+            tol : tolleranza sull'errore relativo del residuo, oppure lista di tolleranze
+                  registrate in un'unica esecuzione (vedi ri.RegistroTolleranze)
+            precondizionatore : None (nessuno), 'jacobi', 'ssor', 'ilu', ... oppure un
+                                oggetto con metodo solve(r, out=None) (vedi precondizionatori)
+            ricalcolo : ogni quante iterazioni ricalcolare il residuo vero b - A x_k
+                        per limitare la deriva della ricorrenza (0 = mai)
+            x0  : soluzione iniziale (opzionale, di default il vettore nullo)
+            riordina : riordinamento da applicare prima di risolvere, es. 'rcm'
+                       (opzionale, vedi _riordina)
+            storico : ogni quante iterazioni registrare la storia della convergenza,
+                      oppure un oggetto ri.Storico (opzionale)
 
+        Output:
+            err   : errore relativo ||x - x_k|| / ||x||
+            nit   : numero di iterazioni effettuate
+            tempo : tempo di esecuzione in secondi
+            (con una lista di tolleranze: lista di [err, nit, tempo] per ogni tolleranza)
+            (con storico: la coppia (risultati, ri.Storico))
+    """
+    A, b, x, x0 = _riordina(A, b, x, x0, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    registro = ri.RegistroTolleranze(tol, x, storico)
+    x_k, r, errR, nIte = inizializza(A, b, x0)
+    controlliDim(A, x)
 
+    M = None if precondizionatore is None else setup.precondizionatore(precondizionatore)
+
+    n = A.shape[0]
+    normB = np.linalg.norm(b)
+    # vettori di lavoro allocati una sola volta
+    r0 = r.copy()
+    p = np.zeros(n)
+    v = np.zeros(n)
+    p_hat = np.empty(n)
+    s_hat = np.empty(n)
+    t = np.empty(n)
+    dx = np.empty(n)
+    rho = alpha = omega = 1.0
+
+    registro.avvia()
+    registro.aggiorna(errR, x_k, nIte)
+    while (errR >= registro.tol):
+        if (nIte < MAXITE):
+            rho_nuovo = r0 @ r
+            if rho_nuovo == 0 or omega == 0:
+                # breakdown: riparto dal residuo corrente
+                r0[:] = r
+                p.fill(0.0)
+                v.fill(0.0)
+                rho = alpha = omega = 1.0
+                rho_nuovo = r0 @ r
+            beta = (rho_nuovo / rho) * (alpha / omega)
+            rho = rho_nuovo
+
+            # p = r + beta (p - omega v)
+            np.multiply(v, omega, out=dx)
+            p -= dx
+            p *= beta
+            p += r
+            ri.prodotto(A, _precondiziona(M, p, p_hat), v)
+            alpha = rho / (r0 @ v)
+
+            # s = r - alpha v (scritto in r)
+            np.multiply(v, alpha, out=dx)
+            r -= dx
+            np.multiply(p_hat, alpha, out=dx)
+            x_k += dx
             nIte += 1
+            errR = np.linalg.norm(r) / normB
+            if errR >= registro.tol:
+                ri.prodotto(A, _precondiziona(M, r, s_hat), t)
+                tt = t @ t
+                omega = (t @ r) / tt if tt > 0 else 0.0
+                np.multiply(s_hat, omega, out=dx)
+                x_k += dx
+                np.multiply(t, omega, out=dx)
+                r -= dx
+
+            # calcolo il residuo
+            if ricalcolo and nIte % ricalcolo == 0:
+                errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            else:
+                errR = np.linalg.norm(r) / normB
+                if errR < registro.tol:
+                    # verifico la convergenza sul residuo vero
+                    errR = ri.errorRelativoResiduoInPlace(A, b, x_k, r, normB)
+            registro.aggiorna(errR, x_k, nIte)
         else:
             raise ValueError("Arrivato al massimo di iterazioni")
 
     stop = time.time()
-    # calcolo il tempo di esecuzione
-    timeIte = stop - start
-    # calcolo errore relativo
-    errRel = ri.errorRelativo(x, x_k)
-    return errRel, nIte, timeIte
+    # calcolo errore relativo e tempo di esecuzione (per ogni tolleranza richiesta)
+    return registro.risultato(x_k, nIte, stop)
+
 
+def _correzioneGmres(H, g, V, j, M, w, z):
+    """
+        Correzione di GMRES dopo j passi: M^-1 V_j y, con y soluzione del sistema
+        triangolare H_j y = g_j (scritta in z, w è un vettore di lavoro).
+    """
+    y = solve_triangular(H[:j, :j], g[:j])
+    np.dot(y, V[:j], out=w)
+    return _precondiziona(M, w, z)
+
+
+def _precondiziona(M, r, out):
+    """
+        Calcola out = M^-1 r, oppure copia r in out se non c'è precondizionatore.
+    """
+    if M is None:
+        np.copyto(out, r)
+        return out
+    return M.solve(r, out=out)
 
+
+def _riordina(A, b, x, x0, riordina):
+    """
+        Applica ad A il riordinamento simmetrico richiesto (vedi riordina.Riordinamento,
+        preparato una sola volta per matrice) e porta b, x e x0 nel nuovo ordine.
+        L'errore relativo ||x - x_k|| / ||x|| non cambia permutando insieme x e x_k,
+        quindi i risultati restituiti sono confrontabili con quelli senza riordinamento.
+
+        INPUT:
+        A, b, x, x0: sistema, soluzione esatta e soluzione iniziale (può essere None).
+        riordina: nome del riordinamento (es. 'rcm') oppure None per non riordinare.
+
+        OUTPUT:
+        A, b, x, x0 nel nuovo ordine.
+    """
+    if riordina is None:
+        return A, b, x, x0
+    P = ottieniSetup(A).riordinamento(riordina)
+    return P.A, P.permuta(b), P.permuta(x), None if x0 is None else P.permuta(x0)
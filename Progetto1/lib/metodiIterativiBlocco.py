@@ -0,0 +1,238 @@
+import numpy as np
+import time
+from Progetto1.lib import risolvi as ri
+from Progetto1.lib.cacheSetup import ottieniSetup
+from Progetto1.lib.controlli import controlliDim
+import Progetto1.lib.metodiIterativi as mt
+from Progetto1.lib.risolvi import numba
+
+# Numero massimo di iterazioni consentite nei metodi iterativi.
+MAXITE = 200000
+# Da questo numero di colonne un unico prodotto (o sostituzione in avanti) sul blocco, che legge
+# A una sola volta, conviene rispetto a un prodotto matrice-vettore per colonna.
+MIN_COLONNE_BLOCCO = 8
+
+# metodi per un solo termine noto, nello stesso ordine di type
+METODI_VETTORE = {
+    1: mt.metodo_jacobi,
+    2: mt.metodo_gaus_seidel,
+    3: mt.metodo_gradiente,
+    4: mt.metodo_gradiente_coniugato,
+}
+
+
+def metodiIterativiBlocco(A, B, X, tol, type, ricalcolo=mt.RICALCOLO, riordina=None):
+    """
+        Risolve contemporaneamente i sistemi lineari A x_j = b_j per tutte le colonne di B
+        usando uno tra quattro metodi iterativi:
+        1 = Jacobi, 2 = Gauss-Seidel, 3 = Gradiente, 4 = Gradiente Coniugato.
+
+        La preparazione (controlli, conversione in CSR, parte triangolare, inversa della
+        diagonale, verifica simmetria e definita positività) viene eseguita una sola volta;
+        a ogni iterazione si usa un unico prodotto matrice sparsa per blocco denso (e per
+        Gauss-Seidel un'unica sostituzione in avanti sul blocco). Come nei metodi di
+        metodiIterativi, gradiente e gradiente coniugato aggiornano il residuo con la
+        ricorrenza R -= alpha * A D, ricalcolandolo ogni ricalcolo iterazioni e alla
+        convergenza (con numba aggiornamento di X, R e dei prodotti r_j^T r_j in un'unica
+        passata). Le colonne sotto tol vengono tolte dal blocco, che viene compattato
+        solo quando l'insieme delle colonne attive cambia. Con meno di MIN_COLONNE_BLOCCO
+        colonne il prodotto per blocco non conviene e ogni colonna viene risolta con il
+        metodo per vettori di metodiIterativi.
+
+        Input:
+        - A: matrice dei coefficienti (sparse matrix)
+        - B: matrice n x k dei termini noti (una colonna per sistema)
+        - X: matrice n x k delle soluzioni esatte (per il calcolo dell'errore)
+        - tol: tolleranza sull'errore relativo del residuo
+        - type: intero da 1 a 4 che identifica il metodo iterativo
+        - ricalcolo: ogni quante iterazioni gradiente e gradiente coniugato ricalcolano
+          il residuo vero B - A X_k (0 = solo alla convergenza)
+        - riordina: riordinamento da applicare prima di risolvere, es. 'rcm'
+          (opzionale, vedi metodiIterativi._riordina; permuta le righe di B e X)
+
+        Output:
+        - errRel: vettore degli errori relativi finali di ogni colonna
+        - nIte: vettore del numero di iterazioni eseguite per ogni colonna
+        - timeIte: tempo di esecuzione in secondi
+    """
+    controlliDim(A, X)
+    A, B, X, _ = mt._riordina(A, B, X, None, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
+    B = np.asarray(B, dtype=np.float64)
+    if B.ndim != 2 or B.shape != X.shape:
+        raise ValueError("Le dimensioni di B non corrispondono a quelle di X")
+
+    if type == 1:
+        D_inv = setup.inversaDiagonale().diagonal()[:, None]
+    elif type == 2:
+        L = setup.triangolareInferiore()
+    elif type == 3 or type == 4:
+        setup.controlloGradientePossibile()
+    else:
+        raise ValueError(" Metodo non trovato ")
+
+    n, k = B.shape
+    if k < MIN_COLONNE_BLOCCO:
+        return _perColonna(A, B, X, tol, type, ricalcolo)
+
+    normB = _norme(B)
+    X_k = np.zeros((n, k))
+    errR = _norme(B) / normB
+    nIte = np.zeros(k, dtype=int)
+
+    # blocchi C-contigui (n x colonne attive) delle sole colonne attive
+    attive = np.flatnonzero(errR >= tol)
+    B_a = B[:, attive]
+    normB_a = normB[attive]
+    X_a = np.zeros(B_a.shape)
+    R_a = B_a.copy()
+    # blocchi di lavoro allocati una sola volta (e a ogni compattazione)
+    W, dX = np.empty(B_a.shape), np.empty(B_a.shape)
+    # prodotti scalari r_j^T r_j delle colonne attive (gradiente e gradiente coniugato)
+    rr = _prodotti(R_a, R_a)
+    if type == 4:
+        D_a = R_a.copy()
+
+    #inizio a calcolare il tempo
+    start = time.time()
+    it = 0
+    #inizio iterazioni
+    while attive.size > 0:
+        if it >= MAXITE:
+            raise ValueError("Arrivato al massimo di iterazioni")
+
+        #controllo come aggiornare X_a
+        if type == 1 or type == 2:
+            if type == 1:
+                np.multiply(D_inv, R_a, out=dX)
+            else:
+                L.solve(R_a, out=dX)
+            X_a += dX
+            it += 1
+            errR_a = _residuo(A, B_a, X_a, R_a, normB_a)
+        else:
+            P_a = R_a if type == 3 else D_a
+            ri.prodotto(A, P_a, W)
+            pAp = _prodotti(P_a, W)
+            # la matrice non è definita positiva (se i controlli non hanno potuto deciderlo)
+            if pAp.min() <= 0:
+                raise ValueError("La matrice non è definita positiva")
+            alpha = rr / pAp
+            it += 1
+            # aggiorno X_a e il residuo con la ricorrenza R -= alpha * A P
+            rr_nuovo = _aggiornaPasso(X_a, R_a, P_a, W, alpha, dX)
+            errR_a = np.sqrt(rr_nuovo) / normB_a
+            if (ricalcolo and it % ricalcolo == 0) or errR_a.min() < tol:
+                # ricalcolo il residuo vero (periodicamente e per verificare la convergenza)
+                errR_a = _residuo(A, B_a, X_a, R_a, normB_a)
+                rr_nuovo = (errR_a * normB_a) ** 2
+            if type == 4:
+                _aggiornaDirezione(D_a, R_a, rr_nuovo / rr)
+            rr = rr_nuovo
+
+        if errR_a.min() < tol:
+            # salvo le colonne arrivate a convergenza e compatto i blocchi sulle altre
+            convergenti = errR_a < tol
+            X_k[:, attive[convergenti]] = X_a[:, convergenti]
+            nIte[attive[convergenti]] = it
+            restanti = ~convergenti
+            attive = attive[restanti]
+            B_a, X_a, R_a = B_a[:, restanti], X_a[:, restanti], R_a[:, restanti]
+            normB_a, rr = normB_a[restanti], rr[restanti]
+            W, dX = np.empty(B_a.shape), np.empty(B_a.shape)
+            if type == 4:
+                D_a = D_a[:, restanti]
+
+    stop = time.time()
+    # calcolo il tempo di esecuzione
+    timeIte = stop - start
+    # calcolo errore relativo di ogni colonna
+    errRel = _norme(X - X_k) / _norme(X)
+    return errRel, nIte, timeIte
+
+
+def _perColonna(A, B, X, tol, type, ricalcolo):
+    """
+        Risolve i sistemi A x_j = b_j uno alla volta con il metodo per vettori
+        corrispondente a type (stessi risultati restituiti da metodiIterativiBlocco).
+    """
+    parametri = {'ricalcolo': ricalcolo} if type >= 3 else {}
+    k = B.shape[1]
+    errRel, nIte, timeIte = np.empty(k), np.zeros(k, dtype=int), 0.0
+    for j in range(k):
+        b, x = np.ascontiguousarray(B[:, j]), np.ascontiguousarray(X[:, j])
+        errRel[j], nIte[j], tempo = METODI_VETTORE[type](A, b, x, tol, **parametri)
+        timeIte += tempo
+    return errRel, nIte, timeIte
+
+
+def _aggiornaPasso(X, R, P, W, alpha, dX):
+    """
+        Passo X += alpha * P e R -= alpha * W (W = A P) colonna per colonna; restituisce
+        r_j^T r_j del nuovo residuo. Con numba le tre operazioni sono un'unica passata
+        sui blocchi (dX non viene usato).
+    """
+    if numba is not None:
+        return _aggiornaPassoNumba(X, R, P, W, alpha)
+    np.multiply(P, alpha, out=dX)
+    X += dX
+    W *= alpha
+    R -= W
+    return _prodotti(R, R)
+
+
+def _aggiornaDirezione(D, R, beta):
+    """
+        Nuova direzione del gradiente coniugato D = R + beta * D (in D).
+    """
+    if numba is not None:
+        _aggiornaDirezioneNumba(D, R, beta)
+    else:
+        D *= beta
+        D += R
+
+
+def _residuo(A, B, X, R, normB):
+    """
+        Residuo vero R = B - A X (scritto in R) ed errore relativo di ogni colonna.
+    """
+    ri.prodotto(A, X, R)
+    np.subtract(B, R, out=R)
+    return _norme(R) / normB
+
+
+def _prodotti(M, N):
+    """
+        Prodotto scalare colonna per colonna di M e N.
+    """
+    return np.einsum('ij,ij->j', M, N)
+
+
+def _norme(M):
+    """
+        Norma euclidea di ogni colonna della matrice M.
+    """
+    return np.sqrt(_prodotti(M, M))
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _aggiornaPassoNumba(X, R, P, W, alpha):
+        n, k = X.shape
+        rr = np.zeros(k)
+        for i in range(n):
+            for c in range(k):
+                X[i, c] += alpha[c] * P[i, c]
+                r = R[i, c] - alpha[c] * W[i, c]
+                R[i, c] = r
+                rr[c] += r * r
+        return rr
+
+    @numba.njit(cache=True)
+    def _aggiornaDirezioneNumba(D, R, beta):
+        n, k = D.shape
+        for i in range(n):
+            for c in range(k):
+                D[i, c] = R[i, c] + beta[c] * D[i, c]
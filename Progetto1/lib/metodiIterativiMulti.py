@@ -1,48 +1,79 @@
-import scipy.sparse as sp
 import time
+import Progetto1.lib.metodiIterativi as mt
 from Progetto1.lib import risolvi as ri
-from Progetto1.lib.controlli import controlliDim, controlloGradientePossibile
+from Progetto1.lib.cacheSetup import ottieniSetup
+from Progetto1.lib.controlli import controlliDim
+from Progetto1.lib.selettore import risolviAuto
 
 # Numero massimo di iterazioni consentite nei metodi iterativi.
 MAXITE = 200000
 
 
-def metodiIterativi(A, b, x, tol, type):
+def metodiIterativi(A, b, x, tol, type, precondizionatore='jacobi', storico=None, riordina=None):
     """
-        Risolve il sistema lineare Ax = b usando uno tra quattro metodi iterativi:
-        1 = Jacobi, 2 = Gauss-Seidel, 3 = Gradiente, 4 = Gradiente Coniugato.
+        Risolve il sistema lineare Ax = b usando uno tra sei metodi iterativi:
+        1 = Jacobi, 2 = Gauss-Seidel, 3 = Gradiente, 4 = Gradiente Coniugato,
+        5 = Gradiente Coniugato Precondizionato, 6 = Gauss-Seidel multicolore,
+        oppure con type = 'auto' il metodo che dovrebbe essere più veloce per la matrice
+        (vedi selettore.scegliMetodo; la scelta e il motivo restano in cache).
 
         Input:
         - A: matrice dei coefficienti (sparse matrix)
         - b: vettore dei termini noti
         - x: vettore iniziale
         - tol: tolleranza sull'errore relativo del residuo
-        - type: intero da 1 a 4 che identifica il metodo iterativo
+        - type: intero da 1 a 6 che identifica il metodo iterativo, oppure 'auto'
+        - precondizionatore: precondizionatore usato con type = 5
+          ('jacobi', 'ssor', 'ic0', 'ilu', vedi precondizionatori)
+        - storico: ogni quante iterazioni registrare la storia della convergenza,
+          oppure un oggetto ri.Storico (opzionale)
+        - riordina: riordinamento da applicare prima di risolvere, es. 'rcm'
+          (opzionale, vedi metodiIterativi._riordina)
 
         Output:
         - errRel: errore relativo finale tra soluzione esatta e approssimata
         - nIte: numero di iterazioni eseguite
         - timeIte: tempo di esecuzione in secondi
+        (con storico: la coppia ((errRel, nIte, timeIte), ri.Storico))
         """
-    global L, D_inv
+    global L, D_inv, M
     controlliDim(A, x)
-    A = A.tocsr()
+    if type == 'auto':
+        return risolviAuto(A, b, x, tol, storico=storico, riordina=riordina)
+    A, b, x, _ = mt._riordina(A, b, x, None, riordina)
+    # preparazione condivisa tra le esecuzioni sulla stessa matrice
+    setup = ottieniSetup(A)
+    A = setup.A
 
-    x_k, r, errR, nIte = ri.inizializza(A, x)
+    x_k, r, errR, nIte = ri.inizializza(A, b)
 
     if type == 1:
-        D_inv = ri.InverseMatrixDiagonal(A)
+        D_inv = setup.inversaDiagonale()
     elif type == 2:
-        L = sp.tril(A)
+        L = setup.triangolareInferiore()
+    elif type == 6:
+        # stesso aggiornamento di Gauss-Seidel con il passo multicolore
+        L = setup.gaussSeidelColori()
     elif type == 3 or type == 4:
-        controlloGradientePossibile(A)
+        setup.controlloGradientePossibile()
+    elif type == 5:
+        setup.controlloGradientePossibile()
+        M = setup.precondizionatore(precondizionatore)
     else:
         raise ValueError(" Metodo non trovato ")
 
     d = r
+    if type == 5:
+        z = M.solve(r)
+        d = z
 
+    # storia della convergenza (opzionale), campionata come nei metodi di metodiIterativi
+    registro = None if storico is None else ri.RegistroTolleranze(tol, x, storico)
     #inizio a calcolare il tempo
     start = time.time()
+    if registro is not None:
+        registro.start = start
+        registro.aggiorna(errR, x_k, nIte)
     #inizio iterazioni
     while (errR > tol):
 
@@ -51,15 +82,19 @@ def metodiIterativi(A, b, x, tol, type):
             if type == 1:
                 x_k = updateJacobi(D_inv, x_k, r)
                 r, errR = ri.errorRelativoResiduo(A, b, x_k)
-            elif type == 2:
-                x_k = updateGausSeidel(A, x_k, r)
+            elif type == 2 or type == 6:
+                x_k = updateGausSeidel(L, x_k, r)
                 r, errR = ri.errorRelativoResiduo(A, b, x_k)
             elif type == 3:
                 x_k = updateGradiente(A, x_k, r)
                 r, errR = ri.errorRelativoResiduo(A, b, x_k)
-            else:
+            elif type == 4:
                 x_k, d, r, errR= updateGradienteConiugato(A, b, x_k, r, d)
+            else:
+                x_k, d, r, z, errR = updateGradienteConiugatoPrecondizionato(A, b, x_k, r, d, z, M)
             nIte += 1
+            if registro is not None:
+                registro.aggiorna(errR, x_k, nIte)
         else:
             raise ValueError("Arrivato al massimo di iterazioni")
     stop = time.time()
@@ -67,6 +102,9 @@ def metodiIterativi(A, b, x, tol, type):
     timeIte = stop - start
     # calcolo errore relativo
     errRel = ri.errorRelativo(x, x_k)
+    if registro is not None:
+        registro.campiona(errR, x_k, nIte, forza=True)
+        return (errRel, nIte, timeIte), registro.storico
     return errRel, nIte, timeIte
 
 
@@ -92,15 +130,15 @@ def updateGausSeidel(L, x, r):
     Aggiornamento della soluzione secondo il metodo di Gauss-Seidel.
 
     Input:
-    - L: parte triangolare inferiore della matrice A
+    - L: risolutore ri.TriangolareInferiore della parte triangolare inferiore di A
+         (oppure colorazione.GaussSeidelColori per la variante multicolore)
     - x: soluzione corrente
     - r: residuo corrente
 
     Output:
     - x_k: nuova iterazione della soluzione
     """
-    x_k= x + ri.SolvTriangularLower(L, r)
-    #x_k = x + sp.linalg.spsolve_triangular(sp.tril(L), r.toarray(), lower=True)
+    x_k= x + L.solve(r)
     return x_k
 
 
@@ -146,4 +184,35 @@ def updateGradienteConiugato(A, b, x, r, d):
     r, errR = ri.errorRelativoResiduo(A, b, x_k)
     beta = ((d @ A) @ r) / denominatore
     d = r - beta * d
-    return x_k, d, r, errR
\ No newline at end of file
+    return x_k, d, r, errR
+
+
+def updateGradienteConiugatoPrecondizionato(A, b, x, r, d, z, M):
+    """
+    Aggiornamento secondo il metodo del Gradiente Coniugato Precondizionato.
+
+    Parametri:
+    - A: matrice dei coefficienti
+    - b: vettore dei termini noti
+    - x: soluzione corrente
+    - r: residuo corrente
+    - d: direzione di discesa precedente
+    - z: residuo precondizionato corrente (M^-1 r)
+    - M: precondizionatore (vedi precondizionatori)
+
+    Output:
+    - x_k: nuova iterazione della soluzione
+    - d: nuova direzione di discesa
+    - r: nuovo residuo
+    - z: nuovo residuo precondizionato
+    - errR: nuovo errore relativo del residuo
+    """
+    rz = r @ z
+    a = rz / (d @ (A @ d))
+    x_k = x + a * d
+
+    r, errR = ri.errorRelativoResiduo(A, b, x_k)
+    z = M.solve(r)
+    beta = (r @ z) / rz
+    d = z + beta * d
+    return x_k, d, r, z, errR
@@ -0,0 +1,237 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg  # noqa: F401  (rende disponibile sp.linalg)
+
+from Progetto1.lib import risolvi as ri
+from Progetto1.lib.risolvi import numba
+
+# Soglia di connessione forte: |a_ij| >= TETA * sqrt(|a_ii a_jj|).
+TETA = 0.08
+# Numero massimo di livelli della gerarchia.
+MAX_LIVELLI = 10
+# Sotto questa dimensione il livello viene risolto in modo diretto.
+DIM_GROSSOLANA = 200
+# Peso del lisciatore di Jacobi (Jacobi smorzato).
+PESO_JACOBI = 2 / 3
+# Iterazioni del metodo delle potenze per stimare il raggio spettrale di D^-1 A.
+ITE_RAGGIO = 20
+
+
+class Multigriglia:
+    """
+        Multigriglia algebrica ad aggregazione smussata (smoothed aggregation).
+
+        Alla costruzione viene creata la gerarchia: a ogni livello i nodi fortemente
+        connessi sono raggruppati in aggregati, il prolungamento a costante a tratti T
+        viene smussato con un passo di Jacobi, P = (I - w D^-1 A) T con
+        w = 4/3 / rho(D^-1 A), e la matrice del livello successivo è A_c = P^T A P.
+        L'ultimo livello viene fattorizzato con sp.linalg.splu.
+
+        solve(r) applica un V-ciclo partendo da zero. Come lisciatori si usano gli
+        aggiornamenti dei metodi iterativi: Gauss-Seidel in avanti prima della
+        correzione e all'indietro dopo (risolutori triangolari di risolvi), oppure
+        Jacobi smorzato. In entrambi i casi il V-ciclo è simmetrico, quindi è
+        utilizzabile come precondizionatore del gradiente coniugato.
+
+        INPUT:
+        A: matrice sparsa quadrata (simmetrica definita positiva per l'uso con CG).
+        lisciatore: 'gauss-seidel' oppure 'jacobi'.
+        passi: numero di passi del lisciatore prima e dopo la correzione.
+
+        Solvable:
+        ValueError: se il lisciatore non esiste.
+    """
+
+    def __init__(self, A, lisciatore='gauss-seidel', passi=1):
+        if lisciatore not in ('gauss-seidel', 'jacobi'):
+            raise ValueError(" Lisciatore non trovato ")
+        self.lisciatore = lisciatore
+        self.passi = passi
+        self.livelli = []
+
+        A = sp.csr_matrix(A, dtype=np.float64)
+        while len(self.livelli) < MAX_LIVELLI - 1 and A.shape[0] > DIM_GROSSOLANA:
+            aggregati = aggregazione(A)
+            nAggregati = aggregati.max(initial=-1) + 1
+            # aggregazione ferma: inutile proseguire
+            if nAggregati == 0 or nAggregati >= A.shape[0]:
+                break
+            P = prolungamento(A, aggregati)
+            self.livelli.append(self._livello(A, P))
+            A = (P.T @ A @ P).tocsr()
+        self.grossolana = sp.linalg.splu(sp.csc_matrix(A))
+        self.dimensioni = [livello['A'].shape[0] for livello in self.livelli] + [A.shape[0]]
+
+    def _livello(self, A, P):
+        """
+            Dati di un livello: matrice, prolungamento, restrizione, lisciatore e vettori di lavoro.
+        """
+        n = A.shape[0]
+        livello = {'A': A, 'P': P.tocsr(), 'R': P.T.tocsr(),
+                   'r': np.empty(n), 'dx': np.empty(n), 'b': np.empty(n),
+                   'bc': np.empty(P.shape[1]), 'xc': np.empty(P.shape[1])}
+        if self.lisciatore == 'jacobi':
+            livello['D_inv'] = PESO_JACOBI * ri.InverseMatrixDiagonal(A).diagonal()
+        else:
+            livello['L'] = ri.TriangolareInferiore(sp.tril(A))
+            livello['U'] = ri.TriangolareSuperiore(sp.triu(A))
+        return livello
+
+    def _liscia(self, livello, b, x, avanti):
+        """
+            Esegue i passi del lisciatore su A x = b aggiornando x.
+        """
+        A, r, dx = livello['A'], livello['r'], livello['dx']
+        for _ in range(self.passi):
+            ri.prodotto(A, x, r)
+            np.subtract(b, r, out=r)
+            if self.lisciatore == 'jacobi':
+                np.multiply(livello['D_inv'], r, out=dx)
+            elif avanti:
+                livello['L'].solve(r, out=dx)
+            else:
+                livello['U'].solve(r, out=dx)
+            x += dx
+
+    def _ciclo(self, k, b, x):
+        """
+            V-ciclo sul livello k per A_k x = b, partendo da x = 0.
+        """
+        if k == len(self.livelli):
+            x[:] = self.grossolana.solve(b)
+            return x
+        livello = self.livelli[k]
+        x.fill(0.0)
+        self._liscia(livello, b, x, avanti=True)
+
+        # correzione dal livello successivo
+        r = livello['r']
+        ri.prodotto(livello['A'], x, r)
+        np.subtract(b, r, out=r)
+        ri.prodotto(livello['R'], r, livello['bc'])
+        self._ciclo(k + 1, livello['bc'], livello['xc'])
+        ri.prodotto(livello['P'], livello['xc'], livello['dx'])
+        x += livello['dx']
+
+        self._liscia(livello, b, x, avanti=False)
+        return x
+
+    def solve(self, r, out=None):
+        """
+            Calcola z = M^-1 r con un V-ciclo (scritto in out se fornito).
+        """
+        if out is None:
+            out = np.empty(r.shape[0])
+        if not self.livelli:
+            out[:] = self.grossolana.solve(r)
+            return out
+        # il livello più fine lavora su una copia di r (r può essere un vettore di lavoro del chiamante)
+        b = self.livelli[0]['b']
+        b[:] = r
+        return self._ciclo(0, b, out)
+
+
+def connessioniForti(A, teta=TETA):
+    """
+        Matrice CSR (senza diagonale) delle connessioni forti di A:
+        |a_ij| >= teta * sqrt(|a_ii a_jj|).
+    """
+    A = sp.csr_matrix(A)
+    diag = np.abs(A.diagonal())
+    righe = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    forte = (A.indices != righe) & (np.abs(A.data) >= teta * np.sqrt(diag[righe] * diag[A.indices]))
+    S = sp.csr_matrix((np.ones(np.count_nonzero(forte)), (righe[forte], A.indices[forte])), shape=A.shape)
+    return S
+
+
+def aggregazione(A, teta=TETA):
+    """
+        Aggregazione standard (Vanek) sul grafo delle connessioni forti di A:
+        1) ogni nodo con tutti i vicini liberi forma un aggregato con essi;
+        2) i nodi rimasti si uniscono a un aggregato vicino creato al passo 1;
+        3) i nodi ancora liberi formano nuovi aggregati con i vicini liberi.
+        I nodi senza connessioni forti restano fuori dagli aggregati (valore -1).
+
+        OUTPUT:
+        aggregati: vettore con l'aggregato di ogni nodo.
+    """
+    S = connessioniForti(A, teta)
+    if numba is not None:
+        return _aggregaNumba(S.shape[0], S.indptr, S.indices)
+    return _aggrega(S.shape[0], S.indptr, S.indices)
+
+
+def prolungamento(A, aggregati):
+    """
+        Prolungamento smussato P = (I - w D^-1 A) T, con T costante a tratti sugli
+        aggregati (colonne normalizzate) e w = 4/3 / rho(D^-1 A).
+    """
+    n = A.shape[0]
+    nAggregati = aggregati.max() + 1
+    dentro = np.flatnonzero(aggregati >= 0)
+    T = sp.csr_matrix((np.ones(dentro.shape[0]), (dentro, aggregati[dentro])), shape=(n, nAggregati))
+    T = T @ sp.diags(1 / np.sqrt(np.asarray(T.sum(axis=0)).ravel()))
+    DA = ri.InverseMatrixDiagonal(A) @ A
+    w = (4 / 3) / _raggioSpettrale(DA)
+    return (T - w * (DA @ T)).tocsr()
+
+
+def _raggioSpettrale(B):
+    """
+        Stima del raggio spettrale di B con ITE_RAGGIO passi del metodo delle potenze.
+    """
+    v = np.random.default_rng(0).random(B.shape[0])
+    rho = 1.0
+    for _ in range(ITE_RAGGIO):
+        w = B @ v
+        norma = np.linalg.norm(w)
+        if norma == 0:
+            break
+        rho = norma / np.linalg.norm(v)
+        v = w / norma
+    return rho
+
+
+def _aggrega(n, indptr, indices):
+    aggregati = np.full(n, -1, dtype=np.int64)
+    nAggregati = 0
+    # passo 1: nodi con tutti i vicini liberi
+    for i in range(n):
+        if aggregati[i] >= 0 or indptr[i] == indptr[i + 1]:
+            continue
+        liberi = True
+        for p in range(indptr[i], indptr[i + 1]):
+            if aggregati[indices[p]] >= 0:
+                liberi = False
+                break
+        if liberi:
+            aggregati[i] = nAggregati
+            for p in range(indptr[i], indptr[i + 1]):
+                aggregati[indices[p]] = nAggregati
+            nAggregati += 1
+
+    # passo 2: unione a un aggregato vicino del passo 1 (senza concatenare i nodi del passo 2)
+    secondo = aggregati.copy()
+    for i in range(n):
+        if aggregati[i] >= 0:
+            continue
+        for p in range(indptr[i], indptr[i + 1]):
+            if aggregati[indices[p]] >= 0:
+                secondo[i] = aggregati[indices[p]]
+                break
+    aggregati = secondo
+
+    # passo 3: nuovi aggregati con i vicini ancora liberi
+    for i in range(n):
+        if aggregati[i] >= 0 or indptr[i] == indptr[i + 1]:
+            continue
+        aggregati[i] = nAggregati
+        for p in range(indptr[i], indptr[i + 1]):
+            if aggregati[indices[p]] < 0:
+                aggregati[indices[p]] = nAggregati
+        nAggregati += 1
+    return aggregati
+
+
+if numba is not None:
+    _aggregaNumba = numba.njit(cache=True)(_aggrega)
@@ -0,0 +1,291 @@
+import numpy as np
+import scipy.sparse as sp
+
+from Progetto1.lib import risolvi as ri
+from Progetto1.lib.multigriglia import Multigriglia
+from Progetto1.lib.risolvi import numba
+
+
+class PrecondizionatoreJacobi:
+    """
+        Precondizionatore di Jacobi: M = D, con D diagonale di A.
+
+        INPUT:
+        A: matrice sparsa quadrata.
+    """
+
+    def __init__(self, A):
+        self.D_inv = ri.InverseMatrixDiagonal(A).diagonal()
+
+    def solve(self, r, out=None):
+        """
+            Calcola z = M^-1 r (scritto in out se fornito).
+        """
+        return np.multiply(self.D_inv, r, out=out)
+
+
+class PrecondizionatoreSSOR:
+    """
+        Precondizionatore SSOR (Symmetric Successive Over-Relaxation):
+        M = 1/(2-w) (D/w + E) (D/w)^-1 (D/w + F)
+        con E ed F parti strettamente inferiore e superiore di A, cioè x + M^-1 (b - A x)
+        equivale a un passo di SOR in avanti seguito da uno all'indietro.
+        Le due sostituzioni usano i risolutori triangolari di risolvi.
+
+        INPUT:
+        A: matrice sparsa quadrata.
+        omega: parametro di rilassamento, 0 < omega < 2.
+    """
+
+    def __init__(self, A, omega=1.0):
+        A = sp.csr_matrix(A)
+        self.D = A.diagonal()
+        diag = sp.diags(self.D, 0, format='csr')
+        self.L = ri.TriangolareInferiore(sp.tril(A, k=-1) + diag)
+        self.U = ri.TriangolareSuperiore(sp.triu(A, k=1) + diag)
+        self._y = np.empty(A.shape[0])
+        self.impostaOmega(omega)
+
+    def impostaOmega(self, omega):
+        """
+            Cambia il parametro di rilassamento aggiornando solo le diagonali dei
+            risolutori triangolari.
+        """
+        if not 0 < omega < 2:
+            raise ValueError("Il parametro omega deve essere compreso tra 0 e 2")
+        self.omega = omega
+        self.D_omega = self.D / omega
+        self.L.impostaDiagonale(self.D_omega)
+        self.U.impostaDiagonale(self.D_omega)
+
+    def solve(self, r, out=None):
+        """
+            Calcola z = M^-1 r (scritto in out se fornito).
+        """
+        self.L.solve(r, out=self._y)
+        self._y *= self.D_omega
+        out = self.U.solve(self._y, out=out)
+        out *= 2 - self.omega
+        return out
+
+
+class PrecondizionatoreIC0:
+    """
+        Precondizionatore di Cholesky incompleta IC(0): M = L L^T, dove L ha la stessa
+        struttura della parte triangolare inferiore di A (nessun riempimento).
+
+        INPUT:
+        A: matrice sparsa simmetrica definita positiva.
+
+        Solvable:
+        ValueError: se la fattorizzazione incompleta incontra un pivot non positivo.
+    """
+
+    def __init__(self, A):
+        L = sp.tril(A, format='csr')
+        L.sum_duplicates()
+        L.sort_indices()
+        n = L.shape[0]
+        # con gli indici ordinati la diagonale è l'ultimo elemento di ogni riga
+        _posizioniDiagonale(L)
+
+        data = L.data.astype(np.float64)
+        if numba is not None:
+            riga = _ic0Numba(n, L.indptr, L.indices, data)
+        else:
+            riga = _ic0(n, L.indptr, L.indices, data)
+        if riga >= 0:
+            raise ValueError(f"Fattorizzazione IC(0) non riuscita: pivot non positivo alla riga {riga}")
+
+        L = sp.csr_matrix((data, L.indices, L.indptr), shape=L.shape)
+        self.L = ri.TriangolareInferiore(L)
+        self.LT = ri.TriangolareSuperiore(L.T)
+        self._y = np.empty(n)
+
+    def solve(self, r, out=None):
+        """
+            Calcola z = (L L^T)^-1 r (scritto in out se fornito).
+        """
+        self.L.solve(r, out=self._y)
+        return self.LT.solve(self._y, out=out)
+
+
+class PrecondizionatoreILU:
+    """
+        Precondizionatore LU incompleta ILU(0): M = L U, dove L (triangolare inferiore con
+        diagonale unitaria) e U hanno la stessa struttura di A (nessun riempimento).
+        Per A simmetrica M è simmetrico, quindi è utilizzabile anche con il gradiente coniugato.
+
+        INPUT:
+        A: matrice sparsa quadrata.
+
+        Solvable:
+        ValueError: se la fattorizzazione incompleta incontra un pivot nullo.
+    """
+
+    def __init__(self, A):
+        LU = sp.csr_matrix(A, dtype=np.float64, copy=True)
+        LU.sum_duplicates()
+        LU.sort_indices()
+        n = LU.shape[0]
+        diag = _posizioniDiagonale(LU)
+        if numba is not None:
+            riga = _ilu0Numba(n, LU.indptr, LU.indices, LU.data, diag)
+        else:
+            riga = _ilu0(n, LU.indptr, LU.indices, LU.data, diag)
+        if riga >= 0:
+            raise ValueError(f"Fattorizzazione ILU(0) non riuscita: pivot nullo alla riga {riga}")
+
+        self.L = ri.TriangolareInferiore(sp.tril(LU, k=-1) + sp.eye(n, format='csr'))
+        self.U = ri.TriangolareSuperiore(sp.triu(LU))
+        self._y = np.empty(n)
+
+    def solve(self, r, out=None):
+        """
+            Calcola z = (LU)^-1 r (scritto in out se fornito).
+        """
+        self.L.solve(r, out=self._y)
+        return self.U.solve(self._y, out=out)
+
+
+PRECONDIZIONATORI = {
+    'jacobi': PrecondizionatoreJacobi,
+    'ssor': PrecondizionatoreSSOR,
+    'ic0': PrecondizionatoreIC0,
+    'ilu': PrecondizionatoreILU,
+    # un V-ciclo di multigriglia algebrica (vedi multigriglia.Multigriglia)
+    'amg': Multigriglia,
+    'amg-jacobi': lambda A: Multigriglia(A, lisciatore='jacobi'),
+}
+
+
+def creaPrecondizionatore(A, tipo):
+    """
+        Costruisce il precondizionatore richiesto per la matrice A.
+
+        INPUT:
+        A: matrice sparsa quadrata.
+        tipo: nome del precondizionatore ('jacobi', 'ssor', 'ic0', 'ilu', 'amg', 'amg-jacobi')
+              oppure un oggetto già costruito con un metodo solve(r, out=None).
+
+        OUTPUT:
+        M: precondizionatore con metodo solve(r, out=None) che calcola M^-1 r.
+
+        Solvable:
+        ValueError: se il precondizionatore non esiste.
+    """
+    if hasattr(tipo, 'solve'):
+        return tipo
+    if tipo not in PRECONDIZIONATORI:
+        raise ValueError(" Precondizionatore non trovato ")
+    return PRECONDIZIONATORI[tipo](A)
+
+
+def _posizioniDiagonale(A):
+    """
+        Restituisce la posizione dell'elemento diagonale di ogni riga negli array
+        di una matrice CSR con indici ordinati.
+
+        Solvable:
+        ValueError: se in qualche riga manca l'elemento diagonale.
+    """
+    n = A.shape[0]
+    righe = np.repeat(np.arange(n), np.diff(A.indptr))
+    pos = np.flatnonzero(A.indices == righe)
+    if pos.shape[0] != n:
+        raise ValueError("Nella diagonale della matrice sono presenti valori uguali a 0 ")
+    return pos
+
+
+def _ilu0(n, indptr, indices, data, diag):
+    """
+        Fattorizzazione ILU(0) in place (variante IKJ) sugli array CSR di A.
+        Restituisce la riga in cui la fattorizzazione fallisce, -1 se riesce.
+    """
+    # posizione negli array CSR di ogni colonna della riga corrente (-1 se assente)
+    pos = np.full(n, -1, dtype=np.int64)
+    for i in range(n):
+        inizio, fine = indptr[i], indptr[i + 1]
+        pos[indices[inizio:fine]] = np.arange(inizio, fine)
+        for p in range(inizio, diag[i]):
+            k = indices[p]
+            data[p] /= data[diag[k]]
+            # aggiorno solo gli elementi della riga i già presenti nella struttura
+            cols = indices[diag[k] + 1:indptr[k + 1]]
+            dest = pos[cols]
+            presenti = dest >= 0
+            data[dest[presenti]] -= data[p] * data[diag[k] + 1 + np.flatnonzero(presenti)]
+        if data[diag[i]] == 0:
+            return i
+        pos[indices[inizio:fine]] = -1
+    return -1
+
+
+def _ic0(n, indptr, indices, data):
+    """
+        Fattorizzazione IC(0) in place sugli array CSR della parte triangolare inferiore.
+        Restituisce la riga in cui la fattorizzazione fallisce, -1 se riesce.
+    """
+    for i in range(n):
+        inizio, diag = indptr[i], indptr[i + 1] - 1
+        for p in range(inizio, diag):
+            k = indices[p]
+            # prodotto tra le righe i e k di L sulle colonne in comune minori di k
+            _, pi, pk = np.intersect1d(indices[inizio:p], indices[indptr[k]:indptr[k + 1] - 1],
+                                       assume_unique=True, return_indices=True)
+            s = data[p] - data[inizio + pi] @ data[indptr[k] + pk]
+            data[p] = s / data[indptr[k + 1] - 1]
+        s = data[diag] - data[inizio:diag] @ data[inizio:diag]
+        if s <= 0:
+            return i
+        data[diag] = np.sqrt(s)
+    return -1
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _ic0Numba(n, indptr, indices, data):
+        for i in range(n):
+            inizio, diag = indptr[i], indptr[i + 1] - 1
+            for p in range(inizio, diag):
+                k = indices[p]
+                s = data[p]
+                # fusione delle colonne ordinate delle righe i e k
+                a, b = inizio, indptr[k]
+                fine_k = indptr[k + 1] - 1
+                while a < p and b < fine_k:
+                    if indices[a] == indices[b]:
+                        s -= data[a] * data[b]
+                        a += 1
+                        b += 1
+                    elif indices[a] < indices[b]:
+                        a += 1
+                    else:
+                        b += 1
+                data[p] = s / data[fine_k]
+            s = data[diag]
+            for p in range(inizio, diag):
+                s -= data[p] * data[p]
+            if s <= 0:
+                return i
+            data[diag] = np.sqrt(s)
+        return -1
+
+    @numba.njit(cache=True)
+    def _ilu0Numba(n, indptr, indices, data, diag):
+        pos = np.full(n, -1, dtype=np.int64)
+        for i in range(n):
+            for p in range(indptr[i], indptr[i + 1]):
+                pos[indices[p]] = p
+            for p in range(indptr[i], diag[i]):
+                k = indices[p]
+                data[p] /= data[diag[k]]
+                for q in range(diag[k] + 1, indptr[k + 1]):
+                    dest = pos[indices[q]]
+                    if dest >= 0:
+                        data[dest] -= data[p] * data[q]
+            if data[diag[i]] == 0:
+                return i
+            for p in range(indptr[i], indptr[i + 1]):
+                pos[indices[p]] = -1
+        return -1
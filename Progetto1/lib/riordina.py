@@ -0,0 +1,90 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+
+def larghezzaBanda(A):
+    """
+        Calcola la larghezza di banda della matrice sparsa A: max |i - j| sugli
+        elementi non nulli a_ij.
+
+        INPUT:
+        A: matrice sparsa.
+
+        OUTPUT:
+        banda: larghezza di banda (0 per una matrice diagonale o vuota).
+    """
+    A = sp.csr_matrix(A)
+    if A.nnz == 0:
+        return 0
+    righe = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    return int(np.abs(righe - A.indices).max())
+
+
+def permutazioneRCM(A):
+    """
+        Permutazione Reverse Cuthill-McKee, calcolata sulla struttura di A + A^T
+        (quindi valida anche per matrici non simmetriche).
+    """
+    return reverse_cuthill_mckee(sp.csr_matrix(A), symmetric_mode=False)
+
+
+RIORDINAMENTI = {
+    'rcm': permutazioneRCM,
+}
+
+
+class Riordinamento:
+    """
+        Riordinamento simmetrico P A P^T di una matrice per ridurne la larghezza di banda:
+        righe e colonne vicine nella matrice permutata migliorano la località del prodotto
+        matrice-vettore e della sostituzione in avanti, e cambiano l'ordine in cui
+        Gauss-Seidel aggiorna le incognite.
+
+        Il sistema A x = b diventa (P A P^T)(P x) = P b: i vettori si portano nel nuovo
+        ordine con permuta e si riportano in quello originale con ripristina. Se la
+        permutazione non riduce la banda si mantiene l'ordine originale (P = I).
+
+        INPUT:
+        A: matrice sparsa quadrata.
+        metodo: nome del riordinamento (vedi RIORDINAMENTI).
+
+        Solvable:
+        ValueError: se il riordinamento non esiste o A non è quadrata.
+    """
+
+    def __init__(self, A, metodo='rcm'):
+        if metodo not in RIORDINAMENTI:
+            raise ValueError(" Riordinamento non trovato ")
+        A = sp.csr_matrix(A)
+        if A.shape[0] != A.shape[1]:
+            raise ValueError("La matrice non è quadrata")
+        self.metodo = metodo
+        self.bandaIniziale = larghezzaBanda(A)
+        self.perm = np.asarray(RIORDINAMENTI[metodo](A), dtype=np.intp)
+        self.A = A[self.perm][:, self.perm].tocsr()
+        self.bandaFinale = larghezzaBanda(self.A)
+        # se la banda non diminuisce (matrice già ben ordinata) si mantiene l'ordine originale
+        if self.bandaFinale >= self.bandaIniziale:
+            self.perm = np.arange(A.shape[0])
+            self.A = sp.csr_matrix(A, copy=True)
+            self.bandaFinale = self.bandaIniziale
+        self.inversa = np.empty_like(self.perm)
+        self.inversa[self.perm] = np.arange(self.perm.shape[0])
+
+        self.A.sort_indices()
+        # in sola lettura: la cache dei dati di preparazione può usarla senza copiarla
+        for array in (self.A.data, self.A.indices, self.A.indptr):
+            array.setflags(write=False)
+
+    def permuta(self, v):
+        """
+            Porta il vettore (o le righe della matrice) v nell'ordine della matrice permutata.
+        """
+        return np.asarray(v)[self.perm]
+
+    def ripristina(self, v):
+        """
+            Riporta il vettore (o le righe della matrice) v nell'ordine originale.
+        """
+        return np.asarray(v)[self.inversa]
@@ -1,47 +1,312 @@
+import time
+
 import numpy as np
 import scipy.sparse as sp
 
+try:
+  import numba
+except ImportError:
+  numba = None
+
+try:
+  # y += A @ x (e Y += A @ X per blocchi di vettori) su array CSR, senza allocare il risultato
+  from scipy.sparse._sparsetools import csr_matvec as _csr_matvec
+  from scipy.sparse._sparsetools import csr_matvecs as _csr_matvecs
+except ImportError:
+  def _csrLocale(n_row, n_col, indptr, indices, data):
+    # come il kernel di SciPy, indptr può contenere posizioni assolute in indices e data
+    p0, p1 = indptr[0], indptr[n_row]
+    return sp.csr_matrix((data[p0:p1], indices[p0:p1], indptr[:n_row + 1] - p0), shape=(n_row, n_col))
+
+  def _csr_matvec(n_row, n_col, indptr, indices, data, x, y):
+    y += _csrLocale(n_row, n_col, indptr, indices, data) @ x
+
+  def _csr_matvecs(n_row, n_col, n_vecs, indptr, indices, data, x, y):
+    y += _csrLocale(n_row, n_col, indptr, indices, data) @ x.reshape(n_col, n_vecs)
+
+
+def livelliTriangolare(A):
+  """
+  Calcola il livello di dipendenza di ogni riga di una matrice triangolare inferiore:
+  la riga i appartiene al livello 1 + max(livello[j]) sulle colonne j < i non nulle
+  (livello 0 se non dipende da nessuna incognita). Le righe di uno stesso livello
+  possono essere risolte contemporaneamente.
+
+  INPUT:
+  A : matrice triangolare inferiore in formato CSR.
+
+  OUTPUT:
+  livello : vettore di interi con il livello di ogni riga.
+  """
+  E = sp.tril(A, k=-1, format='csr')
+  if numba is not None:
+    return _livelliNumba(E.shape[0], E.indptr, E.indices)
+
+  n = E.shape[0]
+  indptr = E.indptr
+  indices = E.indices
+  livello = np.zeros(n, dtype=np.int64)
+  for i in range(n):
+    row_start = indptr[i]
+    row_end = indptr[i + 1]
+    if row_end > row_start:
+      livello[i] = livello[indices[row_start:row_end]].max() + 1
+  return livello
+
+
+def pianoLivelli(A):
+  """
+  Prepara la sostituzione in avanti per livelli: le righe vengono raggruppate
+  per livello di dipendenza e per ogni livello si salva il blocco di righe
+  della parte strettamente inferiore di A.
+
+  INPUT:
+  A : matrice triangolare inferiore (vengono ignorati gli elementi sopra la diagonale).
+
+  OUTPUT:
+  D : diagonale di A.
+  livelli : lista di coppie (righe, E_k) con gli indici delle righe del livello k
+            e la sottomatrice CSR delle loro righe strettamente inferiori.
+  """
+  A = sp.csr_matrix(A)
+  D = A.diagonal()
+  E = sp.tril(A, k=-1, format='csr')
+  livello = livelliTriangolare(E)
+
+  # ordino le righe per livello mantenendo l'ordine originale all'interno del livello
+  ordine = np.argsort(livello, kind='stable')
+  confini = np.concatenate(([0], np.cumsum(np.bincount(livello))))
+  E_ord = E[ordine]
+  indptr = E_ord.indptr
+
+  livelli = []
+  for k in range(len(confini) - 1):
+    inizio, fine = confini[k], confini[k + 1]
+    righe = ordine[inizio:fine]
+    # blocco di righe del livello k costruito direttamente dagli array CSR
+    p0, p1 = indptr[inizio], indptr[fine]
+    E_k = sp.csr_matrix((E_ord.data[p0:p1], E_ord.indices[p0:p1], indptr[inizio:fine + 1] - p0),
+                        shape=(fine - inizio, E.shape[1]))
+    livelli.append((righe, E_k))
+  return D, livelli
+
+
+class TriangolareInferiore:
+  """
+  Risolutore "fattorizza una volta, risolvi molte volte" per sistemi triangolari inferiori.
+
+  Alla costruzione vengono estratti una sola volta la diagonale, la parte strettamente
+  inferiore in formato CSR e (per il motore a livelli) i livelli di dipendenza delle righe;
+  ogni chiamata a solve esegue quindi solo l'aritmetica della sostituzione in avanti.
+
+  INPUT:
+  L : matrice triangolare inferiore (vengono ignorati gli elementi sopra la diagonale).
+  metodo : 'numba' (kernel compilato), 'livelli' (sostituzione per livelli in NumPy)
+           oppure 'auto' (numba se disponibile, altrimenti livelli).
+  """
+
+  def __init__(self, L, metodo='auto'):
+    if metodo == 'auto':
+      metodo = 'numba' if numba is not None else 'livelli'
+    if metodo == 'numba' and numba is None:
+      raise ValueError("numba non è installato")
+    if metodo not in ('numba', 'livelli'):
+      raise ValueError(" Metodo non trovato ")
 
-def SolvTriangularLower(A, b):
+    L = sp.csr_matrix(L)
+    self.metodo = metodo
+    self.n = L.shape[0]
+    self.D = L.diagonal()
+    if metodo == 'numba':
+      self.E = sp.tril(L, k=-1, format='csr')
+      # la prima chiamata compila (o carica dalla cache) il kernel: la si fa qui, fuori
+      # dai tempi misurati dei metodi iterativi
+      vuoto = np.empty(0)
+      _sostituzioneAvantiNumba(0, self.E.indptr, self.E.indices, self.E.data, vuoto, vuoto, vuoto)
+      _sostituzioneAvantiBloccoNumba(0, self.E.indptr, self.E.indices, self.E.data, vuoto,
+                                     np.empty((0, 1)), np.empty((0, 1)))
+    else:
+      self.D, livelli = pianoLivelli(L)
+      # per ogni livello salvo gli array CSR con i valori cambiati di segno, così che
+      # r[righe] - E_k @ x si accumuli direttamente nel vettore estratto da r
+      self.livelli = [(righe, E_k.shape[0], E_k.indptr, E_k.indices, -E_k.data, self.D[righe])
+                      for righe, E_k in livelli]
+
+  def impostaDiagonale(self, D):
+    """
+    Sostituisce la diagonale di L senza ripreparare la parte strettamente inferiore
+    (ad esempio per cambiare il parametro di rilassamento di SOR, con diagonale D / omega).
+    """
+    self.D = np.asarray(D, dtype=np.float64)
+    if self.metodo == 'livelli':
+      self.livelli = [(righe, m, indptr, indices, data, self.D[righe])
+                      for righe, m, indptr, indices, data, _ in self.livelli]
+
+  def solve(self, r, out=None):
+    """
+    Risolve L x = r.
+
+    INPUT:
+    r : vettore dei termini noti, oppure matrice n x k di k termini noti.
+    out : vettore (o matrice C-contigua) preallocato in cui scrivere la soluzione (opzionale).
+          Con il kernel numba i k termini noti vengono risolti insieme, in un solo
+          passaggio sulle righe di L (i k valori di ogni riga sono contigui).
+
+    OUTPUT:
+    x : soluzione del sistema (coincide con out se fornito).
+    """
+    if out is None:
+      out = np.empty(r.shape)
+    if self.metodo == 'numba':
+      E = self.E
+      if r.ndim == 1 or r.shape[1] == 1:
+        _sostituzioneAvantiNumba(self.n, E.indptr, E.indices, E.data, self.D, r.reshape(-1), out.reshape(-1))
+      else:
+        _sostituzioneAvantiBloccoNumba(self.n, E.indptr, E.indices, E.data, self.D,
+                                       np.ascontiguousarray(r), out)
+    elif r.ndim == 1:
+      # ogni livello legge solo incognite dei livelli precedenti, già scritte in out
+      for righe, m, indptr, indices, data, D_k in self.livelli:
+        t = r[righe]
+        _csr_matvec(m, self.n, indptr, indices, data, out, t)
+        out[righe] = t / D_k
+    else:
+      k = r.shape[1]
+      for righe, m, indptr, indices, data, D_k in self.livelli:
+        t = r[righe]
+        _csr_matvecs(m, self.n, k, indptr, indices, data, out, t)
+        out[righe] = t / D_k[:, None]
+    return out
+
+
+class TriangolareSuperiore:
+  """
+  Risolutore "fattorizza una volta, risolvi molte volte" per sistemi triangolari superiori.
+
+  Invertendo l'ordine di righe e colonne una matrice triangolare superiore diventa
+  triangolare inferiore, quindi si riusa TriangolareInferiore sulla matrice ribaltata.
+
+  INPUT:
+  U : matrice triangolare superiore (vengono ignorati gli elementi sotto la diagonale).
+  metodo : 'numba', 'livelli' oppure 'auto' (vedi TriangolareInferiore).
+  """
+
+  def __init__(self, U, metodo='auto'):
+    U = sp.triu(U, format='csr')
+    self.n = U.shape[0]
+    self.D = U.diagonal()
+    self.L = TriangolareInferiore(U[::-1, ::-1], metodo)
+    self.metodo = self.L.metodo
+    # vettori di lavoro per i termini noti e la soluzione in ordine inverso
+    self._r = np.empty(self.n)
+    self._x = np.empty(self.n)
+
+  def impostaDiagonale(self, D):
+    """
+    Sostituisce la diagonale di U (vedi TriangolareInferiore.impostaDiagonale).
+    """
+    self.D = np.asarray(D, dtype=np.float64)
+    self.L.impostaDiagonale(self.D[::-1])
+
+  def solve(self, r, out=None):
+    """
+    Risolve U x = r.
+
+    INPUT:
+    r : vettore dei termini noti.
+    out : vettore preallocato in cui scrivere la soluzione (opzionale).
+
+    OUTPUT:
+    x : soluzione del sistema (coincide con out se fornito).
+    """
+    if out is None:
+      out = np.empty(self.n)
+    self._r[:] = r[::-1]
+    self.L.solve(self._r, out=self._x)
+    out[:] = self._x[::-1]
+    return out
+
+
+def SolvTriangularLower(A, b, metodo='auto'):
   """
   Risolve un sistema lineare Ax = b dove A è una matrice triangolare inferiore .
+  Per risolvere più sistemi con la stessa A conviene costruire una volta TriangolareInferiore.
 
   INPUT:
   A : matrice triangolare inferiore.
   b : vettore colonna dei termini noti.
+  metodo : 'numba', 'livelli' oppure 'auto' (vedi TriangolareInferiore).
 
   OUTPUT:
   x : soluzione del sistema lineare
   """
+  return TriangolareInferiore(A, metodo).solve(b)
 
-  n = A.shape[0]
-  x = np.zeros(n)
-  D = A.diagonal()
 
-  # Calcolo del primo elemento della soluzione
-  x[0] = b[0] / D[0]
+if numba is not None:
+  @numba.njit(cache=True)
+  def _sostituzioneAvantiNumba(n, indptr, indices, data, D, b, x):
+    for i in range(n):
+      sum_ax = 0.0
+      for j in range(indptr[i], indptr[i + 1]):
+        sum_ax += data[j] * x[indices[j]]
+      x[i] = (b[i] - sum_ax) / D[i]
+
+  @numba.njit(cache=True)
+  def _sostituzioneAvantiBloccoNumba(n, indptr, indices, data, D, B, X):
+    k = B.shape[1]
+    sum_ax = np.empty(k)
+    for i in range(n):
+      sum_ax[:] = 0.0
+      for j in range(indptr[i], indptr[i + 1]):
+        a = data[j]
+        x_j = indices[j]
+        for c in range(k):
+          sum_ax[c] += a * X[x_j, c]
+      for c in range(k):
+        X[i, c] = (B[i, c] - sum_ax[c]) / D[i]
 
-  # Sostituzione in avanti per risolvere il sistema triangolare inferiore
-  for i in range(1,n):
-      # Indici degli elementi della riga i-esima nel formato CSR
-      row_start = A.indptr[i]
-      row_end = A.indptr[i + 1]
+  @numba.njit(cache=True)
+  def _livelliNumba(n, indptr, indices):
+    livello = np.zeros(n, dtype=np.int64)
+    for i in range(n):
+      for j in range(indptr[i], indptr[i + 1]):
+        if livello[indices[j]] + 1 > livello[i]:
+          livello[i] = livello[indices[j]] + 1
+    return livello
 
-      # Indici di colonna degli elementi non nulli
-      cols = A.indices[row_start:row_end]
-      #valori non nulli
-      data = A.data[row_start:row_end]
 
-      sum_ax = 0.0
-      # Calcolo del prodotto scalare tra riga i-esima di A e x
-      for j, col in enumerate(cols):
-          if col < i:
-              sum_ax += data[j] * x[col]
+def raggioSpettraleJacobi(A, maxIte=200, tol=1e-4):
+  """
+  Stima con il metodo delle potenze il raggio spettrale della matrice di iterazione
+  di Jacobi B = I - D^-1 A (D diagonale di A, vedi InverseMatrixDiagonal).
+  Gli autovalori di B possono presentarsi a coppie +mu, -mu, quindi la stima usa il
+  rapporto tra le norme a distanza di due iterazioni: rho = sqrt(||B^2 v|| / ||v||).
 
-      # Calcolo dell'x_i
-      x[i] = (b[i] - sum_ax) / D[i]
-  return x
+  INPUT:
+  A : matrice del sistema (basta che supporti A @ v e A.diagonal()).
+  maxIte : numero massimo di iterazioni del metodo delle potenze.
+  tol : tolleranza relativa tra due stime successive per fermarsi.
 
+  OUTPUT:
+  rho : stima del raggio spettrale di B.
+  """
+  D_inv = InverseMatrixDiagonal(A).diagonal()
+  v = np.random.default_rng(0).random(A.shape[0])
+  v /= np.linalg.norm(v)
+  rho = 0.0
+  for _ in range(maxIte):
+    w = v - D_inv * (A @ v)
+    w = w - D_inv * (A @ w)
+    norma = np.linalg.norm(w)
+    if norma == 0:
+      return 0.0
+    rho_nuovo = np.sqrt(norma)
+    v = w / norma
+    if abs(rho_nuovo - rho) <= tol * rho_nuovo:
+      return rho_nuovo
+    rho = rho_nuovo
+  return rho
 
 
 def InverseMatrixDiagonal(A):
@@ -80,6 +345,51 @@ def errorRelativoResiduo(A,b,x):
     errR= (np.linalg.norm(r))/np.linalg.norm(b)
     return r,errR
 
+def prodotto(A, x, out):
+  """
+  Calcola il prodotto matrice-vettore A @ x scrivendolo in un vettore preallocato.
+
+  INPUT:
+  A : matrice del sistema (per le matrici CSR il prodotto non alloca memoria),
+      oppure un operatore con un metodo prodotto(x, out) (es. matriceMappata.MatriceMappata).
+  x : vettore da moltiplicare, oppure matrice C-contigua n x k di vettori.
+  out : vettore (o matrice C-contigua) preallocato in cui scrivere il risultato.
+
+  OUTPUT:
+  out : vettore A @ x.
+  """
+  if sp.issparse(A) and A.format == 'csr':
+    out.fill(0.0)
+    if x.ndim == 1 or x.shape[1] == 1:
+      # un solo vettore (anche come blocco n x 1): il prodotto matrice-vettore è più rapido
+      _csr_matvec(A.shape[0], A.shape[1], A.indptr, A.indices, A.data, x.reshape(-1), out.reshape(-1))
+    else:
+      _csr_matvecs(A.shape[0], A.shape[1], x.shape[1], A.indptr, A.indices, A.data, x, out)
+  elif hasattr(A, 'prodotto'):
+    A.prodotto(x, out)
+  else:
+    out[:] = A @ x
+  return out
+
+def errorRelativoResiduoInPlace(A, b, x, r, normB):
+  """
+  Versione senza allocazioni di errorRelativoResiduo: il residuo r = b - Ax
+  viene scritto nel vettore r già allocato e la norma di b è calcolata una sola volta dal chiamante.
+
+  INPUT:
+  A: matrice del sistema.
+  b: termine noto.
+  x: vettore approssimato della soluzione.
+  r: vettore preallocato in cui scrivere il residuo.
+  normB: norma di b.
+
+  OUTPUT:
+  errR: errore relativo del residuo.
+  """
+  prodotto(A, x, r)
+  np.subtract(b, r, out=r)
+  return np.linalg.norm(r) / normB
+
 def errorRelativo(x,x_k):
   """
     Calcola l'errore relativo tra la soluzione esatta x e quella approssimata x_k.
@@ -93,27 +403,31 @@ def errorRelativo(x,x_k):
   """
   return np.linalg.norm( x-x_k)/np.linalg.norm(x)
 
-def inizializza(A,b):
+def inizializza(A,b,x0=None):
   """
      Inizializza la soluzione approssimata x_k, calcola il residuo e l'errore relativo iniziale.
 
     INPUT:
         A: matrice del sistema.
-        x: soluzione esatta (usata per il calcolo dell'errore).
         b: termine noto.
+        x0: soluzione iniziale (opzionale, ad esempio la soluzione di una risoluzione
+            precedente a tolleranza più larga); se assente si parte dal vettore nullo.
 
     OUTPUT:
-        x_k: soluzione iniziale (tutti zeri).
+        x_k: soluzione iniziale (x0 oppure tutti zeri).
         r: residuo iniziale.
         errR: errore relativo iniziale.
         nIte: contatore delle iterazioni (inizializzato a 0).
   """
-  #verifico che la matrice è salvata in formato sparso
-  if not sp.issparse(A):
+  #verifico che la matrice è salvata in formato sparso (gli operatori con prodotto restano tali)
+  if not sp.issparse(A) and not hasattr(A, 'prodotto'):
    A = sp.csr_array(A).tocsr()
 
   #inizializzo x_0
-  x_k = np.zeros(A.shape[0])
+  if x0 is None:
+    x_k = np.zeros(A.shape[0])
+  else:
+    x_k = np.array(x0, dtype=np.float64)
 
   #calcolo residuo ed errore relativo(RESIDUO)
   r,errR=errorRelativoResiduo(A,b,x_k)
@@ -122,3 +436,171 @@ def inizializza(A,b):
   nIte=0
   return x_k,r,errR,nIte
 
+class Storico:
+  """
+  Storia della convergenza di un metodo iterativo, scritta in array NumPy preallocati:
+  ogni passo iterazioni si registrano numero di iterazione, errore relativo del residuo,
+  tempo dall'inizio e (con errore=True) errore relativo rispetto alla soluzione esatta.
+  Gli array raddoppiano quando sono pieni, quindi il costo per campione resta costante.
+
+  INPUT:
+  passo : ogni quante iterazioni registrare un campione (l'ultima iterazione è sempre registrata).
+  errore : se vero registra anche ||x - x_k|| / ||x|| (costa una norma per campione).
+  capacita : numero iniziale di campioni allocati.
+  """
+
+  def __init__(self, passo=1, errore=False, capacita=1024):
+    if passo < 1:
+      raise ValueError("Il passo dello storico deve essere almeno 1")
+    self.passo = int(passo)
+    self.errore = errore
+    self.n = 0
+    self._iterazioni = np.empty(capacita, dtype=np.int64)
+    self._dati = np.empty((3, capacita))
+
+  def registra(self, nIte, errR, tempo, errore=np.nan):
+    """
+    Aggiunge un campione; se l'iterazione è già l'ultima registrata la sostituisce.
+    """
+    if self.n and self._iterazioni[self.n - 1] == nIte:
+      self.n -= 1
+    if self.n == self._iterazioni.shape[0]:
+      self._iterazioni = np.resize(self._iterazioni, 2 * self.n)
+      dati = np.empty((3, 2 * self.n))
+      dati[:, :self.n] = self._dati
+      self._dati = dati
+    self._iterazioni[self.n] = nIte
+    self._dati[:, self.n] = errR, tempo, errore
+    self.n += 1
+
+  @property
+  def iterazioni(self):
+    return self._iterazioni[:self.n]
+
+  @property
+  def residuo(self):
+    return self._dati[0, :self.n]
+
+  @property
+  def tempo(self):
+    return self._dati[1, :self.n]
+
+  @property
+  def erroreRelativo(self):
+    return self._dati[2, :self.n]
+
+  def fattoreConvergenza(self, campioni=10):
+    """
+    Fattore medio di riduzione del residuo per iterazione negli ultimi campioni
+    (minore di 1 se il metodo converge, vicino a 1 se ristagna).
+    """
+    if self.n < 2:
+      return np.nan
+    inizio = max(self.n - campioni, 0)
+    iterazioni = self.iterazioni[-1] - self.iterazioni[inizio]
+    if iterazioni == 0 or self.residuo[inizio] == 0:
+      return np.nan
+    return (self.residuo[-1] / self.residuo[inizio]) ** (1 / iterazioni)
+
+  def ristagna(self, campioni=10, soglia=0.9999):
+    """
+    Vero se negli ultimi campioni il residuo non si riduce (fattore di convergenza >= soglia).
+    """
+    return bool(self.fattoreConvergenza(campioni) >= soglia)
+
+
+class RegistroTolleranze:
+  """
+  Gestisce il criterio di arresto dei metodi iterativi con una singola tolleranza
+  oppure con una lista di tolleranze (continuazione): in quest'ultimo caso il metodo
+  itera fino alla tolleranza più stretta e, ogni volta che l'errore relativo del residuo
+  scende sotto una delle soglie, registra errore relativo, iterazioni e tempo trascorso,
+  come se fosse stata eseguita una risoluzione separata con quella tolleranza.
+
+  Con storico registra anche la storia della convergenza (vedi Storico), che
+  risultato restituisce insieme ai risultati.
+
+  INPUT:
+  tol : tolleranza (float) oppure lista (non vuota) di tolleranze.
+  x : soluzione esatta (per il calcolo dell'errore).
+  storico : None, ogni quante iterazioni campionare la storia (intero positivo),
+            oppure un oggetto Storico.
+  """
+
+  def __init__(self, tol, x, storico=None):
+    self.x = x
+    if isinstance(storico, (int, np.integer)) and not isinstance(storico, bool):
+      storico = Storico(storico)
+    elif storico is not None and not isinstance(storico, Storico):
+      raise ValueError("Lo storico deve essere un intero positivo oppure un oggetto Storico")
+    self.storico = storico
+    self.multipla = np.ndim(tol) > 0
+    self.tolleranze = list(tol) if self.multipla else [tol]
+    if not self.tolleranze:
+      raise ValueError("La lista delle tolleranze è vuota")
+    # soglie in ordine decrescente: vengono attraversate una dopo l'altra
+    self.ordine = sorted(range(len(self.tolleranze)), key=lambda i: -self.tolleranze[i])
+    self.tol = min(self.tolleranze)
+    self.prossima = 0
+    self.risultati = [None] * len(self.tolleranze)
+    self.start = None
+
+  def avvia(self):
+    """
+    Fa partire il cronometro e restituisce l'istante iniziale.
+    """
+    self.start = time.time()
+    return self.start
+
+  def soglia(self):
+    """
+    Prossima soglia da attraversare (la tolleranza più stretta se non ce ne sono altre):
+    serve ai metodi che aggiornano x_k solo a fine ciclo, come GMRES, per accorgersi delle soglie intermedie.
+    """
+    if self.multipla and self.prossima < len(self.ordine):
+      return self.tolleranze[self.ordine[self.prossima]]
+    return self.tol
+
+  def campiona(self, errR, x_k, nIte, forza=False):
+    """
+    Aggiunge un campione alla storia della convergenza ogni storico.passo iterazioni
+    (o sempre con forza=True); x_k può essere None se il metodo non ha ancora la
+    soluzione corrente (es. GMRES a metà ciclo), e in quel caso l'errore è nan.
+    """
+    storico = self.storico
+    if storico is None or (nIte % storico.passo and not forza):
+      return
+    errore = errorRelativo(self.x, x_k) if storico.errore and x_k is not None else np.nan
+    storico.registra(nIte, errR, time.time() - self.start, errore)
+
+  def aggiorna(self, errR, x_k, nIte):
+    """
+    Registra i risultati delle soglie appena attraversate (solo in modalità continuazione)
+    e il campione della storia della convergenza.
+    """
+    if self.storico is not None:
+      self.errR = errR
+      self.campiona(errR, x_k, nIte)
+    while self.multipla and self.prossima < len(self.ordine):
+      i = self.ordine[self.prossima]
+      if errR >= self.tolleranze[i]:
+        break
+      self.risultati[i] = [errorRelativo(self.x, x_k), nIte, time.time() - self.start]
+      self.prossima += 1
+
+  def risultato(self, x_k, nIte, stop):
+    """
+    OUTPUT:
+    errRel, nIte, timeIte per una singola tolleranza, oppure una lista con
+    [errRel, nIte, timeIte] per ogni tolleranza, nell'ordine in cui sono state date.
+    Con lo storico attivo: la coppia (risultati, storico).
+    """
+    if not self.multipla:
+      risultati = errorRelativo(self.x, x_k), nIte, stop - self.start
+    else:
+      risultati = self.risultati
+    if self.storico is None:
+      return risultati
+    # l'ultima iterazione entra sempre nella storia
+    self.campiona(self.errR, x_k, nIte, forza=True)
+    return risultati, self.storico
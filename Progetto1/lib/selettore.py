@@ -0,0 +1,249 @@
+import time
+from functools import lru_cache
+
+import numpy as np
+import scipy.sparse as sp
+
+import Progetto1.lib.metodiIterativi as mt
+from Progetto1.lib.cacheSetup import ottieniSetup
+from Progetto1.lib.controlli import is_simmetrica
+from Progetto1.lib.precondizionatori import creaPrecondizionatore
+
+# Tolleranza delle esecuzioni di prova usate per stimare il tempo di ogni candidato.
+TOL_PROVA = 1e-3
+# Sotto questa dimensione le prove costano più della differenza tra i metodi: si usa il primo candidato.
+DIM_PICCOLA = 500
+# Sopra questa densità (nnz / n^2) le fattorizzazioni incomplete non convengono.
+DENSITA_MASSIMA = 0.05
+# Dimensione della matrice su cui si compilano i kernel dei precondizionatori prima di misurarli
+# (maggiore della griglia grossolana della multigriglia, così da compilare anche l'aggregazione).
+DIM_COMPILAZIONE = 1000
+
+# metodi tra cui scegliere (vedi metodiIterativi)
+METODI = {
+    'cg': mt.metodo_gradiente_coniugato,
+    'pcg': mt.metodo_gradiente_coniugato_precondizionato,
+    'gmres': mt.metodo_gmres,
+    'bicgstab': mt.metodo_bicgstab,
+}
+
+
+class Scelta:
+    """
+        Metodo scelto da scegliMetodo per una matrice, con il motivo della scelta.
+
+        Attributi:
+        metodo: nome del metodo (vedi METODI).
+        parametri: argomenti aggiuntivi del metodo (es. il precondizionatore).
+        caratteristiche: proprietà della matrice usate per la scelta (vedi caratteristiche).
+        stime: tempo stimato (in secondi) per ogni candidato provato.
+        motivo: descrizione della scelta.
+    """
+
+    def __init__(self, metodo, parametri, caratteristiche, stime, motivo):
+        self.metodo = metodo
+        self.parametri = parametri
+        self.caratteristiche = caratteristiche
+        self.stime = stime
+        self.motivo = motivo
+
+    def esegui(self, A, b, x, tol, x0=None, storico=None):
+        """
+            Risolve A x = b con il metodo scelto (stesso risultato dei metodi di metodiIterativi).
+        """
+        return METODI[self.metodo](A, b, x, tol, x0=x0, storico=storico, **self.parametri)
+
+    def __str__(self):
+        parametri = ', '.join(f"{k}={v}" for k, v in self.parametri.items())
+        return f"{self.metodo}({parametri}): {self.motivo}"
+
+
+def caratteristiche(A):
+    """
+        Proprietà economiche della matrice usate per scegliere il metodo: dimensione,
+        densità, dominanza diagonale per righe, simmetria e, per le matrici simmetriche,
+        l'esito (in cache) del controllo di definita positività.
+
+        INPUT:
+        A: matrice sparsa quadrata oppure operatore (es. matriceMappata.MatriceMappata).
+
+        OUTPUT:
+        car: dizionario con n, nnz, densita, sparsa, dominanzaDiagonale, simmetrica, spd.
+    """
+    setup = ottieniSetup(A)
+    A = setup.A
+    n = A.shape[0]
+    car = {'n': n, 'nnz': A.nnz, 'densita': A.nnz / n ** 2,
+           'sparsa': sp.issparse(A) or hasattr(A, 'tocsr'), 'dominanzaDiagonale': None}
+    if car['sparsa']:
+        S = sp.csr_matrix(A if sp.issparse(A) else A.tocsr())
+        diag = np.abs(S.diagonal())
+        righe = np.repeat(np.arange(n), np.diff(S.indptr))
+        fuori = np.bincount(righe, weights=np.abs(S.data), minlength=n) - diag
+        car['dominanzaDiagonale'] = bool(np.all(diag > fuori))
+
+    try:
+        setup.controlloGradientePossibile()
+        car['simmetrica'] = car['spd'] = True
+    except ValueError:
+        car['spd'] = False
+        try:
+            is_simmetrica(A)
+            car['simmetrica'] = True
+        except ValueError:
+            car['simmetrica'] = False
+    return car
+
+
+def candidati(car):
+    """
+        Metodi applicabili a una matrice con le caratteristiche car, dal più promettente:
+        gradiente coniugato precondizionato per le matrici simmetriche definite positive,
+        BiCGSTAB e GMRES per le altre. Le fattorizzazioni incomplete e la multigriglia
+        richiedono la matrice in memoria e una densità non troppo alta.
+    """
+    fattorizzabile = car['sparsa'] and car['densita'] <= DENSITA_MASSIMA
+    if car['spd']:
+        if not car['sparsa']:
+            return [('pcg', {'precondizionatore': 'jacobi'}), ('cg', {})]
+        lista = [('pcg', {'precondizionatore': 'ic0'}), ('pcg', {'precondizionatore': 'amg'})]
+        if not fattorizzabile:
+            lista = lista[1:]
+        return lista + [('pcg', {'precondizionatore': 'jacobi'})]
+
+    precondizionatore = 'ilu' if fattorizzabile else 'jacobi' if car['sparsa'] else None
+    lista = [('bicgstab', {'precondizionatore': precondizionatore}),
+             ('gmres', {'precondizionatore': precondizionatore})]
+    if car['dominanzaDiagonale'] and precondizionatore == 'ilu':
+        # con dominanza diagonale anche Jacobi è un precondizionatore efficace e costa meno da preparare
+        lista.append(('bicgstab', {'precondizionatore': 'jacobi'}))
+    return lista
+
+
+def scegliMetodo(A, b=None, tol=1e-8):
+    """
+        Sceglie il metodo che dovrebbe risolvere A x = b nel minor tempo.
+        Dalle caratteristiche della matrice si ricavano i metodi applicabili (vedi
+        candidati); per le matrici non piccole ogni precondizionatore viene prima
+        costruito e usato una volta (vedi _preparaPrecondizionatori), poi ogni candidato
+        viene eseguito fino a TOL_PROVA. La stima di un candidato è il costo di
+        costruzione del suo precondizionatore, uguale per tutti i candidati che lo
+        condividono, più il tempo delle iterazioni esteso a tol supponendo convergenza
+        lineare: così l'ordine delle prove non influisce sulla scelta. I dati di
+        preparazione costruiti restano in cache, quindi il metodo scelto non li ricalcola.
+        La scelta viene memorizzata nella cache della matrice per ogni tolleranza.
+
+        INPUT:
+        A: matrice sparsa quadrata oppure operatore.
+        b: termine noto usato nelle prove (di default un vettore casuale).
+        tol: tolleranza a cui si vuole risolvere.
+
+        OUTPUT:
+        scelta: oggetto Scelta con metodo, parametri e motivo.
+
+        Solvable:
+        ValueError: se nessun candidato riesce a risolvere il sistema di prova.
+    """
+    setup = ottieniSetup(A)
+    return setup.ottieni(('auto', tol), lambda: _scegli(setup.A, b, tol))
+
+
+def _scegli(A, b, tol):
+    car = caratteristiche(A)
+    lista = candidati(car)
+    tipo = 'simmetrica definita positiva' if car['spd'] else 'simmetrica non definita positiva' \
+        if car['simmetrica'] else 'non simmetrica'
+    if car['n'] < DIM_PICCOLA:
+        metodo, parametri = lista[0]
+        return Scelta(metodo, parametri, car, {},
+                      f"matrice {tipo} piccola (n = {car['n']}): primo candidato senza prove")
+
+    n = car['n']
+    if b is None:
+        b = np.random.default_rng(0).standard_normal(n)
+    # la soluzione esatta serve solo per l'errore restituito, che qui non si usa
+    x = np.ones(n)
+    tolProva = max(tol, TOL_PROVA)
+    costi = _preparaPrecondizionatori(A, b, lista)
+    stime = {}
+    for metodo, parametri in lista:
+        nome = _nome(metodo, parametri)
+        preparazione = costi.get(parametri.get('precondizionatore'), 0.0)
+        if not np.isfinite(preparazione):
+            stime[nome] = np.inf
+            continue
+        try:
+            _, _, tempoIterazioni = METODI[metodo](A, b, x, tolProva, **parametri)
+        except ValueError:
+            # es. massimo di iterazioni o matrice non definita positiva
+            stime[nome] = np.inf
+            continue
+        stime[nome] = preparazione + tempoIterazioni * np.log(tol) / np.log(tolProva)
+
+    migliore = min(range(len(lista)), key=lambda i: stime[_nome(*lista[i])])
+    metodo, parametri = lista[migliore]
+    if not np.isfinite(stime[_nome(metodo, parametri)]):
+        raise ValueError("Nessun metodo è riuscito a risolvere il sistema di prova")
+    dettagli = ', '.join(f"{k}: {v:.4f}s" for k, v in stime.items())
+    return Scelta(metodo, parametri, car, stime,
+                  f"matrice {tipo}, tempo stimato minimo tra i candidati ({dettagli})")
+
+
+def _preparaPrecondizionatori(A, b, lista):
+    """
+        Costruisce (in cache) i precondizionatori usati dai candidati e ne applica
+        ognuno una volta, così che né la costruzione né la prima esecuzione ricadano sul
+        tempo del primo candidato provato. I kernel numba vengono compilati prima, su una
+        matrice piccola (vedi _compilaKernel), così che il tempo di costruzione misurato
+        non contenga la compilazione.
+
+        OUTPUT:
+        costi: tempo di costruzione di ogni precondizionatore (inf se non costruibile).
+    """
+    setup = ottieniSetup(A)
+    costi = {}
+    for _, parametri in lista:
+        tipo = parametri.get('precondizionatore')
+        if tipo is None or tipo in costi:
+            continue
+        try:
+            _compilaKernel(tipo)
+            inizio = time.time()
+            M = setup.precondizionatore(tipo)
+            costi[tipo] = time.time() - inizio
+            M.solve(b)
+        except ValueError:
+            # es. fattorizzazione incompleta non riuscita
+            costi[tipo] = np.inf
+    return costi
+
+
+@lru_cache(maxsize=None)
+def _compilaKernel(tipo):
+    """
+        Costruisce e applica una volta il precondizionatore tipo su una matrice tridiagonale
+        simmetrica definita positiva di dimensione DIM_COMPILAZIONE, così che la prima
+        chiamata dei kernel numba (compilazione o caricamento dalla cache) avvenga una sola
+        volta per processo e fuori dai tempi misurati.
+    """
+    n = DIM_COMPILAZIONE
+    T = sp.diags([-np.ones(n - 1), 4 * np.ones(n), -np.ones(n - 1)], [-1, 0, 1], format='csr')
+    creaPrecondizionatore(T, tipo).solve(np.ones(n))
+
+
+def risolviAuto(A, b, x, tol, x0=None, storico=None, riordina=None):
+    """
+        Risolve A x = b con il metodo scelto da scegliMetodo; con riordina (es. 'rcm')
+        la scelta e la risoluzione avvengono sul sistema riordinato (vedi mt._riordina).
+
+        OUTPUT:
+        err, nit, tempo come i metodi di metodiIterativi (il tempo delle prove è escluso).
+    """
+    A, b, x, x0 = mt._riordina(A, b, x, x0, riordina)
+    return scegliMetodo(A, b, np.min(tol)).esegui(A, b, x, tol, x0, storico)
+
+
+def _nome(metodo, parametri):
+    if parametri.get('precondizionatore') is None:
+        return metodo
+    return f"{metodo}+{parametri['precondizionatore']}"
@@ -1,29 +1,72 @@
 import math
+from functools import lru_cache
 
 import numpy as np
 import scipy.fftpack as fft
 
-def calcolaD (N):
+# Numero massimo di matrici DCT (per dimensione e tipo) conservate in cache.
+MAX_MATRICI_DCT = 32
+
+def calcolaD (N, dtype=np.float64):
     """
     Calcola la matrice di trasformazione DCT ortonormale D di dimensione NxN.
 
+    Gli elementi D[i, j] = alpha_i * cos(i * pi * (2j + 1) / (2N)) sono calcolati
+    in un'unica operazione vettoriale (broadcasting di i sulle righe e j sulle colonne).
+
     Args:
         N (int): Dimensione della matrice.
+        dtype (np.dtype): Tipo degli elementi (il calcolo avviene sempre in float64).
 
     Returns:
         np.ndarray: Matrice D di dimensione (N, N).
     """
-    D = np.zeros((N,N))
-    alpha = np.zeros(N)
-
+    alpha = np.full(N, np.sqrt(2/N))
     alpha[0] = 1/np.sqrt(N)
-    alpha[1:N] = np.sqrt(2/N)
 
-    for i in range(N):
-        for j in range(N):
-            D[i,j] = alpha[i] * np.cos(i * math.pi * (2 * j + 1) / (2 * N))
+    i = np.arange(N)[:, None]
+    j = np.arange(N)[None, :]
+    D = alpha[:, None] * np.cos(i * math.pi * (2 * j + 1) / (2 * N))
+    return D.astype(dtype, copy=False)
+
+def matriceDCT(N, dtype=np.float64):
+    """
+    Restituisce la matrice DCT ortonormale NxN (vedi calcolaD), calcolata una sola
+    volta per ogni coppia (N, dtype) e conservata in una cache LRU.
+
+    La matrice è in sola lettura, così che nessun chiamante possa modificare
+    l'istanza condivisa.
+
+    Args:
+        N (int): Dimensione della matrice.
+        dtype (np.dtype): Tipo degli elementi.
+
+    Returns:
+        np.ndarray: Matrice D di dimensione (N, N), in sola lettura.
+    """
+    # il tipo viene normalizzato così che np.float64, 'float64' e np.dtype('float64') usino la stessa voce
+    return _matriceDCT(int(N), np.dtype(dtype))
+
+@lru_cache(maxsize=MAX_MATRICI_DCT)
+def _matriceDCT(N, dtype):
+    D = calcolaD(N, dtype)
+    D.setflags(write=False)
     return D
 
+def matriceIDCT(N, dtype=np.float64):
+    """
+    Restituisce la matrice della IDCT ortonormale, cioè la trasposta di matriceDCT(N, dtype)
+    (una vista in sola lettura della matrice in cache, senza copie).
+
+    Args:
+        N (int): Dimensione della matrice.
+        dtype (np.dtype): Tipo degli elementi.
+
+    Returns:
+        np.ndarray: Matrice D.T di dimensione (N, N), in sola lettura.
+    """
+    return matriceDCT(N, dtype).T
+
 def dct(f):
     """
     Applica la DCT 1D ortonormale a un vettore.
@@ -36,7 +79,7 @@ def dct(f):
     """
     f = f.astype('float64')
     N = len(f)
-    D = calcolaD(N)
+    D = matriceDCT(N)
     return D @ f
 
 def idct(c):
@@ -51,59 +94,69 @@ def idct(c):
     """
     c = c.astype('float64')
     N = len(c)
-    D = calcolaD(N)
-    return D.T @ c
+    return matriceIDCT(N) @ c
 
-def calcolaI_DCT2(f_mat,D, n,m):
+def calcolaI_DCT2(f_mat, D, n, m, D_m=None, out=None):
     """
-    Applica la DCT o IDCT 2D (dipende dalla matrice D usata).
+    Applica la DCT o IDCT 2D (dipende dalle matrici usate): C = D · F · D_mᵀ.
+
+    La trasformata per colonne (D · F) e quella per righe (· D_mᵀ) sono due prodotti
+    matrice-matrice (BLAS-3) invece di un prodotto matrice-vettore per ogni colonna e riga.
+    Con un array di più dimensioni la trasformata è applicata a ogni matrice n x m
+    sugli ultimi due assi (es. tutti i blocchi di un'immagine in una volta).
 
     Args:
-        f_mat (np.ndarray): Matrice immagine.
-        D (np.ndarray): Matrice DCT (o trasposta per IDCT).
+        f_mat (np.ndarray): Matrice immagine (n x m), oppure array (..., n, m).
+        D (np.ndarray): Matrice DCT n x n delle colonne (o trasposta per IDCT).
         n (int): Numero righe.
         m (int): Numero colonne.
+        D_m (np.ndarray): Matrice m x m delle righe (di default D, per matrici quadrate).
+        out (np.ndarray): Matrice n x m in cui scrivere il risultato (opzionale),
+            dello stesso tipo di D.
 
     Returns:
-        np.ndarray: Matrice trasformata.
+        np.ndarray: Matrice trasformata (coincide con out se fornito).
     """
-    c_mat= np.copy(f_mat.astype('float64'))
+    if D_m is None:
+        D_m = D
+    if D.shape != (n, n) or D_m.shape != (m, m) or f_mat.shape[-2:] != (n, m):
+        raise ValueError("Le dimensioni delle matrici di trasformazione non corrispondono a quelle della matrice")
+    f_mat = np.asarray(f_mat).astype(D.dtype, copy=False)
 
     # Trasformata per colonne
-    for j in range(m):
-        c_mat[:,j]= D @ c_mat[:, j]
+    c_mat = D @ f_mat
     # Trasformata per righe
-    for j in range(n):
-        c_mat[j,:]= (D @ (c_mat[j,:]).T).T
-    return c_mat
+    return np.matmul(c_mat, D_m.T, out=out)
 
-def dct2(f_mat):
+def dct2(f_mat, out=None, dtype=np.float64):
     """
-    Applica la DCT2 a una matrice.
+    Applica la DCT2 a una matrice (anche rettangolare) o a ogni matrice sugli ultimi due assi.
 
     Args:
-        f_mat (np.ndarray): Matrice immagine.
+        f_mat (np.ndarray): Matrice immagine, oppure array (..., n, m).
+        out (np.ndarray): Matrice in cui scrivere i coefficienti (opzionale).
+        dtype (np.dtype): Tipo del calcolo (es. np.float32 per maggiore velocità).
 
     Returns:
         np.ndarray: Coefficienti DCT2.
     """
-    n, m = f_mat.shape
-    D = calcolaD(n)
-    return calcolaI_DCT2(f_mat, D, n, m)
+    n, m = f_mat.shape[-2:]
+    return calcolaI_DCT2(f_mat, matriceDCT(n, dtype), n, m, matriceDCT(m, dtype), out)
 
-def idct2(c_mat):
+def idct2(c_mat, out=None, dtype=np.float64):
     """
-    Applica la IDCT2 a una matrice.
+    Applica la IDCT2 a una matrice (anche rettangolare) o a ogni matrice sugli ultimi due assi.
 
     Args:
-        c_mat (np.ndarray): Coefficienti DCT2.
+        c_mat (np.ndarray): Coefficienti DCT2, oppure array (..., n, m).
+        out (np.ndarray): Matrice in cui scrivere il risultato (opzionale).
+        dtype (np.dtype): Tipo del calcolo (es. np.float32 per maggiore velocità).
 
     Returns:
         np.ndarray: Matrice immagine ricostruita.
     """
-    n, m = c_mat.shape
-    D = calcolaD(n)
-    return calcolaI_DCT2(c_mat, D.T, n, m)
+    n, m = c_mat.shape[-2:]
+    return calcolaI_DCT2(c_mat, matriceIDCT(n, dtype), n, m, matriceIDCT(m, dtype), out)
 
 def dct_lib(f_mat):
     """
@@ -113,10 +166,11 @@ def dct_lib(f_mat):
 
 def dct2_lib(f_mat):
     """
-    DCT 2D ortonormale usando SciPy (applicata su righe e poi colonne).
+    DCT 2D ortonormale usando SciPy (applicata su righe e poi colonne); con un array
+    di più dimensioni è applicata a ogni matrice sugli ultimi due assi.
     """
-    righe = dct_lib(f_mat.T)
-    return dct_lib(righe.T)
+    righe = dct_lib(np.swapaxes(f_mat, -1, -2))
+    return dct_lib(np.swapaxes(righe, -1, -2))
 
 def idct_lib(c_mat):
     """
@@ -127,9 +181,114 @@ def idct_lib(c_mat):
 
 def idct2_lib(c_mat):
     """
-    IDCT 2D ortonormale usando SciPy (applicata su righe e poi colonne).
+    IDCT 2D ortonormale usando SciPy (applicata su righe e poi colonne); con un array
+    di più dimensioni è applicata a ogni matrice sugli ultimi due assi.
+    """
+    righe = idct_lib(np.swapaxes(c_mat, -1, -2))
+    return idct_lib(np.swapaxes(righe, -1, -2))
+
+
+def dct_fft(f, axis=-1, norm='ortho'):
     """
-    righe = idct_lib(c_mat.T)
-    return idct_lib(righe.T)
+    DCT-II veloce, O(N log N), con una FFT reale di lunghezza N (algoritmo di Makhoul).
 
+    Il vettore viene riordinato in v = (f_0, f_2, f_4, ..., f_5, f_3, f_1): con V = FFT(v)
+    vale e^{-i pi k / 2N} V_k = C_k - i C_{N-k}, dove C_k = sum_n f_n cos(pi k (2n+1) / 2N),
+    quindi basta la metà k = 0..N/2 dello spettro (np.fft.rfft) per avere tutti i coefficienti.
 
+    Args:
+        f (np.ndarray): Vettore o array di input (trasformato lungo axis).
+        axis (int): Asse lungo cui applicare la trasformata.
+        norm (str): 'ortho' (ortonormale, come dct e dct_lib) oppure None
+            (non normalizzata, come scipy.fftpack.dct con norm=None: 2 * C_k).
+
+    Returns:
+        np.ndarray: Coefficienti DCT, con la stessa forma di f.
+
+    Raises:
+        ValueError: Se norm non è 'ortho' né None.
+    """
+    _controllaNorm(norm)
+    x = np.moveaxis(np.asarray(f, dtype=np.float64), axis, -1)
+    N = x.shape[-1]
+    W, alpha = _fattoriFFT(N)
+
+    v = np.concatenate((x[..., ::2], x[..., 1::2][..., ::-1]), axis=-1)
+    WV = np.fft.rfft(v, axis=-1) * W
+    k = np.arange(1, N // 2 + 1)
+    C = np.empty(x.shape)
+    C[..., :N // 2 + 1] = WV.real
+    C[..., N - k] = -WV.imag[..., k]
+
+    C *= alpha if norm == 'ortho' else 2.0
+    return np.moveaxis(C, -1, axis)
+
+def idct_fft(c, axis=-1, norm='ortho'):
+    """
+    DCT-III veloce (inversa di dct_fft), O(N log N): si ricostruisce lo spettro
+    V_k = e^{i pi k / 2N} (C_k - i C_{N-k}) per k = 0..N/2, si applica np.fft.irfft e
+    si annulla il riordinamento di dct_fft.
+
+    Args:
+        c (np.ndarray): Coefficienti DCT (trasformati lungo axis).
+        axis (int): Asse lungo cui applicare la trasformata.
+        norm (str): 'ortho' oppure None (come scipy.fftpack.idct con norm=None:
+            idct_fft(dct_fft(f, norm=None), norm=None) = 2N f).
+
+    Returns:
+        np.ndarray: Vettore o array ricostruito, con la stessa forma di c.
+
+    Raises:
+        ValueError: Se norm non è 'ortho' né None.
+    """
+    _controllaNorm(norm)
+    X = np.moveaxis(np.asarray(c, dtype=np.float64), axis, -1)
+    N = X.shape[-1]
+    W, alpha = _fattoriFFT(N)
+
+    # coefficienti C_k del vettore cercato rispetto a sum_n x_n cos(pi k (2n+1) / 2N)
+    C = X / alpha if norm == 'ortho' else X * N
+    k = np.arange(1, N // 2 + 1)
+    C_rev = np.zeros(C.shape[:-1] + (N // 2 + 1,))
+    C_rev[..., k] = C[..., N - k]
+    v = np.fft.irfft(np.conj(W) * (C[..., :N // 2 + 1] - 1j * C_rev), n=N, axis=-1)
+
+    x = np.empty(X.shape)
+    meta = (N + 1) // 2
+    x[..., ::2] = v[..., :meta]
+    x[..., 1::2] = v[..., meta:][..., ::-1]
+    return np.moveaxis(x, -1, axis)
+
+def dct2_fft(f_mat, norm='ortho'):
+    """
+    DCT2 veloce (vedi dct_fft) applicata per colonne e poi per righe; con un array
+    di più dimensioni è applicata a ogni matrice sugli ultimi due assi.
+    """
+    return dct_fft(dct_fft(f_mat, axis=-2, norm=norm), axis=-1, norm=norm)
+
+def idct2_fft(c_mat, norm='ortho'):
+    """
+    IDCT2 veloce (vedi idct_fft) applicata per colonne e poi per righe; con un array
+    di più dimensioni è applicata a ogni matrice sugli ultimi due assi.
+    """
+    return idct_fft(idct_fft(c_mat, axis=-2, norm=norm), axis=-1, norm=norm)
+
+def _controllaNorm(norm):
+    """
+    Verifica che la normalizzazione richiesta sia 'ortho' oppure None.
+    """
+    if norm not in ('ortho', None):
+        raise ValueError(f"Normalizzazione non valida: {norm!r} (usare 'ortho' oppure None)")
+
+@lru_cache(maxsize=MAX_MATRICI_DCT)
+def _fattoriFFT(N):
+    """
+    Fattori e^{-i pi k / 2N} (k = 0..N/2) e coefficienti di normalizzazione alpha_k
+    della DCT veloce di lunghezza N (in sola lettura, condivisi tra le chiamate).
+    """
+    W = np.exp(-1j * math.pi * np.arange(N // 2 + 1) / (2 * N))
+    alpha = np.full(N, np.sqrt(2/N))
+    alpha[0] = 1/np.sqrt(N)
+    W.setflags(write=False)
+    alpha.setflags(write=False)
+    return W, alpha
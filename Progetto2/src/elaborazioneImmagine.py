@@ -1,10 +1,15 @@
 
 import os
+from functools import lru_cache
+
 import numpy as np
 from PIL import Image
 
 from Progetto2.src.DCT2 import dct2_lib, idct2
 
+# Numero massimo di maschere (per coppia f, d) conservate in cache.
+MAX_MASCHERE = 64
+
 class ElaboraImg:
     """
         Classe per elaborazione di immagini in scala di grigi tramite
@@ -24,91 +29,103 @@ class ElaboraImg:
         array = np.array(img)
         return array
 
+    @staticmethod
+    @lru_cache(maxsize=MAX_MASCHERE)
+    def maschera(f, d):
+        """
+        Maschera delle frequenze mantenute nei blocchi f x f con soglia d (i + j < d),
+        calcolata una sola volta per ogni coppia (f, d) e conservata in cache.
+
+        Oltre alla maschera restituisce gli indici, nel blocco appiattito (i * f + j),
+        dei coefficienti mantenuti: con questi si estraggono (e si ricollocano) solo i
+        coefficienti utili invece di moltiplicare l'intero blocco per la maschera.
+        Entrambi gli array sono in sola lettura.
+
+        :param f: dimensione del blocco
+        :param d: soglia di compressione
+        :return: (maschera booleana f x f, indici piatti dei coefficienti mantenuti)
+        """
+        i, j = np.indices((f, f))
+        mask = (i + j) < d
+        indici = np.flatnonzero(mask)
+        mask.setflags(write=False)
+        indici.setflags(write=False)
+        return mask, indici
+
     @staticmethod
     def __split_matrix_into_blocks(M, f):
         """
-        Divide una matrice M (immagine) in blocchi quadrati f x f.
+        Divide una matrice M (immagine) in blocchi quadrati f x f, senza copiarla:
+        restituisce una vista 4-D in cui blocchi[i, j] è il blocco M[f*i:f*(i+1), f*j:f*(j+1)].
+        Le righe e colonne finali che non formano un blocco intero vengono ignorate.
 
         :param M: matrice dell'immagine (array 2D)
         :param f: dimensione del blocco (es. 8 per blocchi 8x8)
-        :return: lista di blocchi f x f estratti dalla matrice
+        :return: vista (righe // f, colonne // f, f, f) dei blocchi della matrice
         """
         rig, col = M.shape
-        blocchi = []
-        # Scorri righe e colonne a passi di f per estrarre i blocchi f x f
-        for i in range(rig // f):
-            for j in range(col // f):
-                blocchi.append(M[f*i:f*(i+1), f*j:f*(j+1)])
-        return blocchi
+        rig_b, col_b = rig // f, col // f
+        # separo ogni asse in (indice del blocco, posizione nel blocco) e porto le posizioni in fondo
+        return M[:rig_b * f, :col_b * f].reshape(rig_b, f, col_b, f).transpose(0, 2, 1, 3)
 
     @staticmethod
     def __assemblaBlocchi(colonne, f, ff_blocchi, righe):
         """
-        Ricompone una matrice immagine a partire da una lista di blocchi.
+        Ricompone una matrice immagine a partire dai blocchi (operazione inversa
+        di __split_matrix_into_blocks).
 
         :param colonne: numero di colonne dell'immagine originale
         :param f: dimensione del blocco
-        :param ff_blocchi: lista di blocchi ricostruiti (post-IDCT)
+        :param ff_blocchi: array (righe // f, colonne // f, f, f) di blocchi ricostruiti (post-IDCT)
         :param righe: numero di righe dell'immagine originale
         :return: array 2D ricostruito unendo i blocchi
         """
-        righe_assemblate = []
-        blocchi_per_riga = colonne // f
-
-        # Ricostruisce ogni riga unendo i blocchi
-        for i in range(righe // f):
-            # Estrai i blocchi relativi alla riga corrente
-            riga_blocchi = ff_blocchi[i * blocchi_per_riga: (i + 1) * blocchi_per_riga]
-            # Unisci i blocchi (ricostruisce una riga intera)
-            riga = np.hstack(riga_blocchi)
-            righe_assemblate.append(riga)
-
-        # Unisci tutte le righe per ottenere l'immagine completa
-        matrice_img = np.vstack(righe_assemblate).astype(np.uint8)
+        rig_b, col_b = righe // f, colonne // f
+        matrice_img = ff_blocchi.transpose(0, 2, 1, 3).reshape(rig_b * f, col_b * f).astype(np.uint8)
         return matrice_img
 
     @staticmethod
-    def __applicaIDCT2(c_blocchi):
+    def __applicaIDCT2(c_blocchi, f, d):
         """
-        Applica la trasformata discreta del coseno inversa (IDCT2) su ciascun blocco.
+        Ricolloca i coefficienti mantenuti nei blocchi f x f (gli altri sono nulli) e
+        applica la trasformata discreta del coseno inversa (IDCT2) a tutti i blocchi
+        in una volta (sugli ultimi due assi).
 
-        :param c_blocchi: lista di blocchi con coefficienti DCT compressi
-        :return: lista di blocchi ricostruiti (immagine decompressa)
+        :param c_blocchi: array (..., k) dei k coefficienti mantenuti di ogni blocco (vedi __applicaDCT)
+        :param f: dimensione del blocco
+        :param d: soglia di compressione usata in __applicaDCT
+        :return: array (..., f, f) di blocchi ricostruiti (immagine decompressa)
         """
-        ff_blocchi = []
-        for c in c_blocchi:
-            #applico IDCT2
-            ff = idct2(c)
-            # Limita tra 0 e 255 e arrotonda al intero più vicino
-            ff = np.clip(np.round(ff), 0, 255)
-            ff_blocchi.append(ff)
-
-        return ff_blocchi
+        _, indici = ElaboraImg.maschera(f, d)
+        forma = c_blocchi.shape[:-1]
+        c_pieni = np.zeros(forma + (f * f,))
+        c_pieni[..., indici] = c_blocchi
+        #applico IDCT2
+        ff_blocchi = idct2(c_pieni.reshape(forma + (f, f)))
+        # Limita tra 0 e 255 e arrotonda al intero più vicino
+        return np.clip(np.round(ff_blocchi), 0, 255)
 
     @staticmethod
     def __applicaDCT(blocchi, d):
         """
-        Applica la DCT2 a ciascun blocco e azzera i coefficienti di alta frequenza.
+        Applica la DCT2 a tutti i blocchi in una volta (sugli ultimi due assi) e
+        conserva solo i coefficienti di bassa frequenza.
 
-        La soglia 'd' indica la diagonale oltre la quale i coefficienti vengono annullati
-        (cioè mantiene solo quelli in cui i + j < d).
+        La soglia 'd' indica la diagonale oltre la quale i coefficienti vengono scartati
+        (cioè mantiene solo quelli in cui i + j < d). I coefficienti mantenuti vengono
+        estratti con gli indici precalcolati di maschera, quindi ogni blocco occupa
+        k valori invece di f x f (k = d(d+1)/2 per d <= f).
 
-        :param blocchi: lista di blocchi f x f da comprimere
-        :param d: soglia di compressione (frequenze alte azzerate)
-        :return: lista di blocchi trasformati e compressi
+        :param blocchi: array (..., f, f) di blocchi da comprimere
+        :param d: soglia di compressione (frequenze alte scartate)
+        :return: array (..., k) dei coefficienti mantenuti di ogni blocco
         """
-
-        c_blocchi = []
-        #applico DCT2 per ogni blocco
-        for b in blocchi:
-            c = dct2_lib(b)
-            ri, co = c.shape
-            # Applica maschera a diagonale: azzera coefficienti con i + j >= d
-            mask = np.fromfunction(lambda i, j: (i + j) < d, (ri, co))
-            c *= mask
-
-            c_blocchi.append(c)
-        return c_blocchi
+        #applico DCT2 a tutti i blocchi
+        c_blocchi = dct2_lib(blocchi)
+        f = c_blocchi.shape[-1]
+        # Estrae i coefficienti con i + j < d (stessi indici per tutti i blocchi)
+        _, indici = ElaboraImg.maschera(f, d)
+        return c_blocchi.reshape(c_blocchi.shape[:-2] + (f * f,))[..., indici]
 
     @staticmethod
     def elaboraImg(image_path, f, d):
@@ -138,7 +155,7 @@ class ElaboraImg:
         c_blocchi = ElaboraImg.__applicaDCT(blocchi, d)
 
         # 4. Applica IDCT per decodifica
-        ff_blocchi = ElaboraImg.__applicaIDCT2(c_blocchi)
+        ff_blocchi = ElaboraImg.__applicaIDCT2(c_blocchi, f, d)
 
         # 5. Ricompone l'immagine dai blocchi
         matrice_img = ElaboraImg.__assemblaBlocchi(colonne, f, ff_blocchi, righe)
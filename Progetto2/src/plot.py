@@ -1,15 +1,17 @@
 from matplotlib import pyplot as plt
 import numpy as np
 
-def plot_dct_times(times_scipy_dct, times_my_dct, matrix_dimensions):
+def plot_dct_times(times_scipy_dct, times_my_dct, matrix_dimensions, times_fft_dct=None):
     """
     Genera un grafico (in scala logaritmica) dei tempi di esecuzione della DCT2,
-    confrontando l'implementazione personale con quella della libreria SciPy.
+    confrontando l'implementazione personale con quella della libreria SciPy
+    (e, se forniti, con la DCT2 veloce basata su FFT).
 
     Args:
         times_scipy_dct (list of float): Tempi di esecuzione per DCT2 con SciPy.
         times_my_dct (list of float): Tempi di esecuzione per la DCT2 implementata manualmente.
         matrix_dimensions (list of int): Dimensioni delle matrici NxN testate.
+        times_fft_dct (list of float): Tempi di esecuzione per la DCT2 veloce con FFT (opzionale).
 
     Salva un file PNG e mostra il grafico.
     """
@@ -27,6 +29,10 @@ def plot_dct_times(times_scipy_dct, times_my_dct, matrix_dimensions):
     plt.semilogy(matrix_dimensions, times_my_dct, label='DCT2 implementata', color="tab:blue")
     plt.semilogy(matrix_dimensions, n3, label='n^3', color="tab:blue", linestyle='dashed')
 
+    #mia implementazione veloce (FFT)
+    if times_fft_dct is not None:
+        plt.semilogy(matrix_dimensions, times_fft_dct, label='DCT2 FFT implementata', color="tab:orange")
+
 
     plt.xlabel('Dimensione N')
     plt.ylabel('Tempo di esecuzione in secondi')
@@ -2,7 +2,7 @@ import time
 
 import numpy as np
 
-from Progetto2.src.DCT2 import dct2_lib, dct2, dct, dct_lib
+from Progetto2.src.DCT2 import dct2_lib, dct2, dct, dct_lib, dct2_fft, dct_fft, idct2_fft
 from Progetto2.src.plot import plot_dct_times
 
 test_matrix = np.array([
@@ -46,18 +46,26 @@ def test():
     print(np.allclose(dct_lib(test_matrix[0]), expected_dct_first_row, rtol=1e-2))
     print("Verifica correttezza di my_dct1: ")
     print(np.allclose(dct(test_matrix[0]), expected_dct_first_row, rtol=1e-2))
+    print("Verifica correttezza di fft_dct2: ")
+    print(np.allclose(dct2_fft(test_matrix), expected_dct2_result, rtol=1e-2))
+    print("Verifica correttezza di fft_dct1: ")
+    print(np.allclose(dct_fft(test_matrix[0]), expected_dct_first_row, rtol=1e-2))
+    print("Verifica correttezza di fft_idct2: ")
+    print(np.allclose(idct2_fft(dct2_fft(test_matrix)), test_matrix))
 
 
 def test_N():
     """
-    Confronta i tempi di esecuzione della DCT2 tra l'implementazione personale (my_dct2)
-     e quella fornita dalla libreria SciPy (dct2_lib), su matrici quadrate di dimensioni crescenti.
+    Confronta i tempi di esecuzione della DCT2 tra l'implementazione personale (my_dct2),
+     quella veloce basata su FFT (dct2_fft) e quella fornita dalla libreria SciPy (dct2_lib),
+     su matrici quadrate di dimensioni crescenti.
 
     Dimensioni testate: da 50x50 a 1000x1000 con step di 50.
 
     Returns:
         tempiDCT2_lib (list): Tempi di esecuzione della DCT2 con SciPy.
         tempiDCT2_imp (list): Tempi di esecuzione della DCT2 implementata manualmente.
+        tempiDCT2_fft (list): Tempi di esecuzione della DCT2 veloce implementata con FFT.
         matrix_dimensions (list): Dimensioni delle matrici testate.
     """
     # da 50x50 a 1000x1000, con incrementi di 50.
@@ -69,6 +77,9 @@ def test_N():
 
     #lista vuota per memorizzare i tempi di esecuzione della mia implementazione della DCT2.
     tempiDCT2_imp = []
+
+    #lista vuota per memorizzare i tempi di esecuzione della DCT2 veloce (FFT).
+    tempiDCT2_fft = []
     for n in matrix_dimensions:
         print("Dimension: ", n)
 
@@ -88,8 +99,14 @@ def test_N():
         stop = time.time()
         tempiDCT2_imp.append(stop - start)
 
+        # Misuro il tempo di esecuzione della DCT2 veloce basata su FFT.
+        start = time.time()
+        dct2_fft(matrix)
+        stop = time.time()
+        tempiDCT2_fft.append(stop - start)
+
     # Restituisco i tempi di esecuzione e le dimensioni delle matrici testate.
-    return tempiDCT2_lib, tempiDCT2_imp, matrix_dimensions
+    return tempiDCT2_lib, tempiDCT2_imp, tempiDCT2_fft, matrix_dimensions
 
 def main():
     """
@@ -97,8 +114,8 @@ def main():
     infine stampa e visualizza i risultati.
     """
     test()
-    tempiDCT2_lib, tempiDCT2_imp, matrix_dimensions = test_N()
-    plot_dct_times(tempiDCT2_lib, tempiDCT2_imp, matrix_dimensions)
+    tempiDCT2_lib, tempiDCT2_imp, tempiDCT2_fft, matrix_dimensions = test_N()
+    plot_dct_times(tempiDCT2_lib, tempiDCT2_imp, matrix_dimensions, tempiDCT2_fft)
 
 
 